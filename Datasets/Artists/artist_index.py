@@ -0,0 +1,227 @@
+import os
+import time
+import hashlib
+import sqlite3
+import argparse
+
+from Datasets.Artists.extract_unique_artists import (
+    iter_artworks_streaming,
+    normalize_artist,
+)
+from Datasets.instrumentation import RunReport
+
+# Number of postings inserted per executemany call
+BATCH_SIZE = 10000
+
+
+class ArtistIndex:
+    """On-disk inverted index from normalized artist names to artworks.
+
+    Every posting maps an artist name, normalized like `extract_unique_artists`
+    does, to the dataset of an artwork and its position within that dataset
+    in the merged XML, along with its image file and title. Descriptors such
+    as "Publisher" are stored in a separate role column, so that a name finds
+    all the artworks the artist contributed to. The index is
+    rebuilt incrementally: the merged XML is skipped entirely if it did not
+    change, and only the datasets whose artworks changed are rewritten.
+    """
+
+    def __init__(self, index_file):
+        self.db = sqlite3.connect(index_file)
+        self.db.executescript("""
+            CREATE TABLE IF NOT EXISTS postings (
+                artist TEXT NOT NULL COLLATE NOCASE,
+                dataset TEXT NOT NULL,
+                position INTEGER NOT NULL,
+                role TEXT NOT NULL,
+                image_file TEXT,
+                title TEXT,
+                PRIMARY KEY (artist, dataset, position, role)
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS datasets (
+                dataset TEXT PRIMARY KEY,
+                digest TEXT NOT NULL,
+                artworks INTEGER NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS source (
+                path TEXT PRIMARY KEY,
+                size INTEGER NOT NULL,
+                mtime INTEGER NOT NULL
+            );
+            """)
+
+    def build(self, xml_file, phase=None):
+        """Update the index from the merged XML. Returns the updated datasets.
+
+        The artworks read are counted in `phase`, the `Phase` of a `RunReport`.
+        """
+        stat = os.stat(xml_file)
+        path = os.path.abspath(xml_file)
+        known = self.db.execute(
+            "SELECT size, mtime FROM source WHERE path = ?", (path,)
+        ).fetchone()
+        if known == (stat.st_size, stat.st_mtime_ns):
+            print("The merged XML did not change, the index is up to date.")
+            return []
+
+        start = time.perf_counter()
+        updated = []
+        seen = []
+        count = 0
+        dataset = None
+
+        for name, artwork in iter_artworks_streaming(xml_file, with_dataset=True):
+            if name != dataset:
+                if dataset is not None:
+                    self._finish_dataset(dataset, digest, position, batch, updated)
+                dataset = name
+                seen.append(dataset)
+                digest = hashlib.sha256()
+                position = 0
+                batch = []
+                self.db.execute("DROP TABLE IF EXISTS staging")
+                self.db.execute(
+                    "CREATE TEMP TABLE staging AS SELECT * FROM postings WHERE 0"
+                )
+
+            artist_text = artwork.findtext("artist") or ""
+            image_file = artwork.findtext("image_file")
+            title = artwork.findtext("title")
+            # Hash the indexed fields to detect the datasets that changed
+            digest.update(
+                "\0".join([artist_text, image_file or "", title or ""]).encode() + b"\n"
+            )
+            for artist_name in normalize_artist(artist_text) if artist_text else ():
+                role, _, artist = artist_name.rpartition(": ")
+                batch.append((artist, dataset, position, role, image_file, title))
+            if len(batch) >= BATCH_SIZE:
+                self._stage(batch)
+                batch = []
+            position += 1
+            count += 1
+
+        if dataset is not None:
+            self._finish_dataset(dataset, digest, position, batch, updated)
+
+        # Forget the datasets that are not in the merged XML anymore
+        for (name,) in self.db.execute("SELECT dataset FROM datasets").fetchall():
+            if name not in seen:
+                self.db.execute("DELETE FROM postings WHERE dataset = ?", (name,))
+                self.db.execute("DELETE FROM datasets WHERE dataset = ?", (name,))
+                updated.append(name)
+
+        self.db.execute(
+            "INSERT OR REPLACE INTO source VALUES (?, ?, ?)",
+            (path, stat.st_size, stat.st_mtime_ns),
+        )
+        self.db.commit()
+
+        if phase is not None:
+            phase.records = count
+            phase.read(xml_file)
+        elapsed = time.perf_counter() - start
+        print(
+            f"Indexed {count} artworks in {elapsed:.1f}s "
+            f"({count / elapsed if elapsed else 0:.0f} artworks/s), "
+            f"updated: {', '.join(updated) or 'none'}"
+        )
+        return updated
+
+    def _stage(self, batch):
+        self.db.executemany(
+            "INSERT OR IGNORE INTO staging VALUES (?, ?, ?, ?, ?, ?)", batch
+        )
+
+    def _finish_dataset(self, dataset, digest, artworks, batch, updated):
+        """Replace the postings of a dataset if its artworks changed."""
+        self._stage(batch)
+        digest = digest.hexdigest()
+        known = self.db.execute(
+            "SELECT digest FROM datasets WHERE dataset = ?", (dataset,)
+        ).fetchone()
+        if known is None or known[0] != digest:
+            self.db.execute("DELETE FROM postings WHERE dataset = ?", (dataset,))
+            self.db.execute("INSERT OR IGNORE INTO postings SELECT * FROM staging")
+            self.db.execute(
+                "INSERT OR REPLACE INTO datasets VALUES (?, ?, ?)",
+                (dataset, digest, artworks),
+            )
+            updated.append(dataset)
+        self.db.execute("DROP TABLE staging")
+
+    def lookup(self, artist, dataset=None):
+        """Return the artworks of an artist as (artist, dataset, position, role,
+        image_file, title) tuples.
+
+        The query is normalized like the indexed names, so "Cassatt, Mary"
+        finds the artworks of "Mary Cassatt".
+        """
+        names = [
+            name.rpartition(": ")[2] for name in normalize_artist(artist) or (artist,)
+        ]
+        query = "SELECT * FROM postings WHERE artist IN ({})".format(
+            ", ".join("?" * len(names))
+        )
+        params = list(names)
+        if dataset is not None:
+            query += " AND dataset = ?"
+            params.append(dataset)
+        return self.db.execute(query + " ORDER BY dataset, position", params).fetchall()
+
+    def close(self):
+        self.db.close()
+
+
+if __name__ == "__main__":
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+
+    parser = argparse.ArgumentParser(
+        description="Build or query the artist to artworks index."
+    )
+    parser.add_argument(
+        "--index_file",
+        type=str,
+        default=os.path.join(script_dir, "artist_index.sqlite"),
+        help="Path to the SQLite index.",
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    build_parser = subparsers.add_parser("build", help="Build or update the index.")
+    build_parser.add_argument(
+        "--xml_file",
+        type=str,
+        default=os.path.join(os.path.dirname(script_dir), "merged_datasets.xml"),
+        help="Path to the merged XML file.",
+    )
+    build_parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="Profile the build to Datasets/reports (build.prof).",
+    )
+
+    query_parser = subparsers.add_parser(
+        "query", help="Find the artworks of an artist."
+    )
+    query_parser.add_argument("artist", type=str, help="Name of the artist.")
+    query_parser.add_argument(
+        "--dataset",
+        type=str,
+        default=None,
+        help="Only return artworks of this dataset.",
+    )
+    args = parser.parse_args()
+
+    index = ArtistIndex(args.index_file)
+    if args.command == "build":
+        with RunReport("Artists/artist_index", args.index_file, args.profile) as report:
+            with report.phase("build", hot=True) as phase:
+                index.build(args.xml_file, phase)
+                phase.wrote(args.index_file)
+    else:
+        start = time.perf_counter()
+        hits = index.lookup(args.artist, args.dataset)
+        elapsed = time.perf_counter() - start
+        for artist, dataset, position, role, image_file, title in hits:
+            print(f"{dataset}\t{position}\t{artist}\t{role}\t{image_file}\t{title}")
+        print(f"{len(hits)} artworks found in {elapsed * 1000:.1f} ms")
+    index.close()
@@ -0,0 +1,94 @@
+import argparse
+import random
+import time
+
+import pandas as pd
+
+from Datasets.Artists.extract_unique_artists import (
+    artist_names,
+    normalize_artist,
+    normalize_artist_column,
+)
+
+FIRST_NAMES = ["Mary", "Judith", "Berthe", "Artemisia", "Rosa", "Sofonisba", "Clara"]
+SURNAMES = ["Cassatt", "Leyster", "Morisot", "Gentileschi", "Bonheur", "Peeters"]
+ACCENTED = ["Fran\\u00e7oise", "Ang\\u00e9lique", "Élisabeth", "Zo\\u00eb"]
+ROLES = ["Artist", "Publisher", "Engraver", "Printer"]
+
+
+def make_artist_string(rng, i):
+    """Return a random <artist> text shaped like those of the merged datasets."""
+    first = rng.choice(FIRST_NAMES + ACCENTED)
+    surname = f"{rng.choice(SURNAMES)}{i}"
+    name = f"{first} {surname}"
+    shape = rng.random()
+    if shape < 0.35:
+        # "Surname, Name" as in the Met and GAC
+        return f"{surname}, {first}"
+    if shape < 0.55:
+        return f"{name} ({rng.choice(['Dutch', 'French', 'Japanese'])}, 1600-1660)"
+    if shape < 0.75:
+        # List representations as in Ukiyo-e
+        roles = rng.sample(ROLES, rng.randint(1, 2))
+        return str([f"{role}: {name}" for role in roles])
+    if shape < 0.8:
+        return "nan"
+    return name
+
+
+def make_distribution(n_artists, n_strings, exponent, seed):
+    """Sample artist strings following a Zipf-like popularity distribution."""
+    rng = random.Random(seed)
+    artists = [make_artist_string(rng, i) for i in range(n_artists)]
+    weights = [1 / (rank + 1) ** exponent for rank in range(n_artists)]
+    return rng.choices(artists, weights=weights, k=n_strings)
+
+
+def benchmark(name, function, strings):
+    start = time.perf_counter()
+    result = function(strings)
+    elapsed = time.perf_counter() - start
+    print(f"{name:>8}: {len(strings) / elapsed:12.0f} strings/s")
+    return result, len(strings) / elapsed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Benchmark the artist-name normalization on synthetic strings."
+    )
+    parser.add_argument(
+        "--artists", type=int, default=200000, help="Number of distinct strings"
+    )
+    parser.add_argument(
+        "--strings", type=int, default=2000000, help="Number of sampled strings"
+    )
+    parser.add_argument(
+        "--exponent", type=float, default=1.1, help="Exponent of the Zipf weights"
+    )
+    parser.add_argument("--seed", type=int, default=0, help="Random seed")
+    args = parser.parse_args()
+
+    strings = make_distribution(args.artists, args.strings, args.exponent, args.seed)
+    print(f"Sampled {len(strings)} strings, {len(set(strings))} distinct")
+
+    normalize_artist.cache_clear()
+    reference, baseline = benchmark(
+        "uncached", lambda strings: [tuple(artist_names(s)) for s in strings], strings
+    )
+    cached, cached_rate = benchmark(
+        "cached", lambda strings: [normalize_artist(s) for s in strings], strings
+    )
+    normalize_artist.cache_clear()
+    batch, batch_rate = benchmark(
+        "batch",
+        lambda strings: normalize_artist_column(pd.Series(strings)).tolist(),
+        strings,
+    )
+
+    if cached != reference or batch != reference:
+        raise SystemExit("The normalized names differ from the uncached ones")
+    print("All methods produce identical names")
+    print(
+        f"Speedup: cached {cached_rate / baseline:.1f}x, "
+        f"batch {batch_rate / baseline:.1f}x"
+    )
@@ -0,0 +1,282 @@
+import os
+import re
+import time
+import argparse
+import unicodedata
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from difflib import SequenceMatcher
+import pandas as pd
+
+from Datasets.instrumentation import RunReport, executor
+
+NON_ALPHANUMERIC = re.compile(r"[\W_]+")
+
+# Tokens telling apart the artists of different generations sharing a name, as
+# the Ukiyo-e pupils who took their master's name ("Utagawa Hiroshige II")
+GENERATIONS = frozenset(
+    ["i", "ii", "iii", "iv", "v", "vi", "vii", "viii", "ix", "x"]
+    + ["1st", "2nd", "3rd", "4th", "5th", "shodai", "nidai", "sandai", "yondai"]
+    + ["jr", "junior", "sr", "senior", "elder", "younger"]
+)
+
+# Match keys of the names, set in every worker process by `init_worker`
+_keys = None
+
+
+def match_key(name):
+    """Fold a name for matching: drop the descriptor, accents, case and punctuation."""
+    # "Publisher: Eijudo" refers to the same person as "Eijudo"
+    name = name.split(":")[-1]
+    decomposed = unicodedata.normalize("NFKD", name)
+    name = "".join(char for char in decomposed if not unicodedata.combining(char))
+    return NON_ALPHANUMERIC.sub(" ", name.casefold()).strip()
+
+
+def blocking_keys(key, prefix_length=4):
+    """Return the blocking keys of a match key.
+
+    Names sharing a key are compared with each other: the sorted tokens catch
+    reordered names ("Rijn Rembrandt van") and the leading character n-gram of
+    every token catches spelling variants of the same surname or given name.
+    """
+    tokens = key.split()
+    keys = {"tokens:" + " ".join(sorted(tokens))}
+    for token in tokens:
+        if len(token) >= 3:
+            keys.add("prefix:" + token[:prefix_length])
+    return keys
+
+
+def candidate_pairs(keys, max_block=200):
+    """Return the pairs of names sharing at least one blocking key.
+
+    Blocks larger than `max_block` (e.g. the prefix of "van") are skipped, which
+    bounds the work per name and keeps the number of pairs near-linear.
+    """
+    blocks = defaultdict(list)
+    for i, key in enumerate(keys):
+        for block_key in blocking_keys(key):
+            blocks[block_key].append(i)
+
+    pairs = set()
+    skipped = 0
+    for members in blocks.values():
+        if len(members) > max_block:
+            skipped += 1
+            continue
+        for a in range(len(members)):
+            for b in range(a + 1, len(members)):
+                pairs.add((members[a], members[b]))
+    if skipped:
+        print(f"Skipped {skipped} blocks with more than {max_block} names")
+    return sorted(pairs)
+
+
+def generation(key):
+    """Return the generation tokens of a match key."""
+    return {token for token in key.split() if token in GENERATIONS}
+
+
+def similarity(a, b, threshold=0.0):
+    """Similarity of two match keys, ignoring the order of their tokens.
+
+    Names of different generations ("Utagawa Kunisada" and "Utagawa Kunisada
+    II") are never similar. Returns 0 early when the cheap upper bounds are
+    already below `threshold`.
+    """
+    if generation(a) != generation(b):
+        return 0.0
+
+    sorted_a = " ".join(sorted(a.split()))
+    sorted_b = " ".join(sorted(b.split()))
+    if sorted_a == sorted_b:
+        return 1.0
+
+    best = 0.0
+    for x, y in ((a, b), (sorted_a, sorted_b)):
+        matcher = SequenceMatcher(None, x, y, autojunk=False)
+        if matcher.real_quick_ratio() < threshold or matcher.quick_ratio() < threshold:
+            continue
+        best = max(best, matcher.ratio())
+    return best
+
+
+def init_worker(keys):
+    global _keys
+    _keys = keys
+
+
+def score_pairs(pairs, threshold):
+    """Return the pairs of a chunk whose similarity reaches `threshold`."""
+    return [
+        (a, b)
+        for a, b in pairs
+        if similarity(_keys[a], _keys[b], threshold) >= threshold
+    ]
+
+
+class UnionFind:
+    def __init__(self, size):
+        self.parent = list(range(size))
+
+    def find(self, i):
+        root = i
+        while self.parent[root] != root:
+            root = self.parent[root]
+        # Path compression
+        while self.parent[i] != root:
+            self.parent[i], i = root, self.parent[i]
+        return root
+
+    def union(self, a, b):
+        a, b = self.find(a), self.find(b)
+        if a != b:
+            self.parent[max(a, b)] = min(a, b)
+
+
+def canonical_name(names):
+    """Pick the name representing a cluster.
+
+    Names without descriptors or "Surname, Name" commas are preferred, then
+    those with the most accented characters (the folded variants lost
+    information), then the longest. The names of a cluster all have the same
+    generation tokens, so the longest cannot be another generation.
+    """
+    return min(
+        names,
+        key=lambda name: (
+            ":" in name,
+            "," in name,
+            -sum(not char.isascii() for char in name),
+            -len(name),
+            name,
+        ),
+    )
+
+
+def deduplicate_artists(
+    artists, threshold=0.9, max_block=200, workers=None, chunk_size=10000, profile=False
+):
+    """Cluster the artist names and return a DataFrame with their artist IDs.
+
+    The returned DataFrame has the columns artist, artist_id and canonical_name.
+    """
+    start = time.perf_counter()
+    keys = [match_key(artist) for artist in artists]
+
+    pairs = candidate_pairs(keys, max_block)
+    print(f"Scoring {len(pairs)} candidate pairs for {len(artists)} artists...")
+
+    clusters = UnionFind(len(artists))
+    chunks = [pairs[i : i + chunk_size] for i in range(0, len(pairs), chunk_size)]
+    if profile:
+        # The pairs are scored in this process, where cProfile sees them
+        init_worker(keys)
+    with executor(
+        ProcessPoolExecutor,
+        profile,
+        max_workers=workers,
+        initializer=init_worker,
+        initargs=(keys,),
+    ) as pool:
+        for matches in pool.map(score_pairs, chunks, [threshold] * len(chunks)):
+            for a, b in matches:
+                clusters.union(a, b)
+
+    members = defaultdict(list)
+    for i, artist in enumerate(artists):
+        members[clusters.find(i)].append(artist)
+
+    canonical = {root: canonical_name(names) for root, names in members.items()}
+    # Number the clusters in the alphabetical order of their canonical names
+    ids = {
+        root: artist_id
+        for artist_id, root in enumerate(sorted(canonical, key=canonical.get))
+    }
+    df = pd.DataFrame(
+        {
+            "artist": artists,
+            "artist_id": [ids[clusters.find(i)] for i in range(len(artists))],
+            "canonical_name": [
+                canonical[clusters.find(i)] for i in range(len(artists))
+            ],
+        }
+    ).sort_values(["artist_id", "artist"], ignore_index=True)
+
+    elapsed = time.perf_counter() - start
+    print(
+        f"Grouped {len(artists)} artists into {len(ids)} clusters in {elapsed:.1f}s "
+        f"({len(pairs) / elapsed if elapsed else 0:.0f} pairs/s)"
+    )
+    return df
+
+
+if __name__ == "__main__":
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+
+    parser = argparse.ArgumentParser(
+        description="Cluster the unique artists into canonical artist IDs."
+    )
+    parser.add_argument(
+        "--input_file",
+        type=str,
+        default=os.path.join(script_dir, "unique_artists.txt"),
+        help="Text file with one artist per line (from extract_unique_artists.py).",
+    )
+    parser.add_argument(
+        "--output_file",
+        type=str,
+        default=os.path.join(script_dir, "artist_clusters.csv"),
+        help="Path to the CSV file the clusters are saved to.",
+    )
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.9,
+        help="Minimum similarity for two names to be merged.",
+    )
+    parser.add_argument(
+        "--max_block",
+        type=int,
+        default=200,
+        help="Skip blocking keys shared by more names than this.",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="Number of worker processes (defaults to the number of CPUs).",
+    )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="Profile the clustering, in a single process, to "
+        "Datasets/reports (cluster.prof).",
+    )
+    args = parser.parse_args()
+
+    with RunReport(
+        "Artists/deduplicate_artists", args.output_file, args.profile
+    ) as report:
+        with report.phase("read") as phase:
+            with open(args.input_file, "r") as f:
+                artists = sorted({line.rstrip("\n") for line in f if line.strip()})
+            phase.records = len(artists)
+            phase.read(args.input_file)
+
+        with report.phase("cluster", hot=True) as phase:
+            df = deduplicate_artists(
+                artists,
+                args.threshold,
+                args.max_block,
+                args.workers,
+                profile=args.profile,
+            )
+            phase.records = len(artists)
+
+        with report.phase("write") as phase:
+            df.to_csv(args.output_file, index=False)
+            phase.records = len(df)
+            phase.wrote(args.output_file)
+    print(f"Artist clusters saved to '{args.output_file}'.")
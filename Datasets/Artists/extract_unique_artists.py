@@ -1,52 +1,125 @@
 import os
+import time
+import argparse
 import xml.etree.ElementTree as ET
 import ast
 import re
+from functools import lru_cache
+import numpy as np
+import pandas as pd
 
+from Datasets.instrumentation import RunReport
 
-def extract_unique_artists(xml_file):
-    print("Extracting unique artists from the XML file...")
-
-    tree = ET.parse(xml_file)
-    root = tree.getroot()
+# Number of distinct raw <artist> strings whose normalized names are cached
+CACHE_SIZE = 2**18
+UNICODE_ESCAPE = re.compile(r"\\u[0-9a-fA-F]{4}")
 
-    artists = set()
 
+def iter_artworks(xml_file):
+    """Yield the <artwork> elements of the merged XML, parsing the whole tree first."""
+    root = ET.parse(xml_file).getroot()
     for dataset in root:
-        for artwork in dataset:
-            artist = artwork.find("artist")
-            if artist is not None and artist.text:
-                artist_text = artist.text
-
-                # Skip if the artist name is 'nan'
-                if artist_text.lower() == "nan":
-                    continue
-
-                # Check if the artist text is a list representation
-                if artist_text.startswith("[") and artist_text.endswith("]"):
-                    try:
-                        artist_list = ast.literal_eval(artist_text)
-                        for artist_item in artist_list:
-                            # If the list length is 1, remove descriptors
-                            remove_descriptor = len(artist_list) == 1
-                            artist_name = process_artist_name(
-                                artist_item, remove_descriptor=remove_descriptor
-                            )
-                            artists.add(artist_name)
-                    except (ValueError, SyntaxError):
-                        # Handle cases where the string representation is not a valid list
-                        artist_name = process_artist_name(artist_text)
-                        artists.add(artist_name)
-                else:
-                    # If the text is not a list, remove descriptors
-                    artist_name = process_artist_name(
-                        artist_text, remove_descriptor=True
-                    )
-                    artists.add(artist_name)
+        yield from dataset
+
+
+def iter_artworks_streaming(xml_file, with_dataset=False):
+    """Yield the <artwork> elements of the merged XML as soon as they are parsed.
+
+    Each artwork is removed from the tree once it has been handled, so memory
+    does not grow with the size of the file. With `with_dataset`, (dataset
+    name, artwork) tuples are yielded instead.
+    """
+    # Elements whose end tag has not been seen yet: <Datasets>, <Dataset>, ...
+    open_elements = []
+    for event, element in ET.iterparse(xml_file, events=("start", "end")):
+        if event == "start":
+            open_elements.append(element)
+            continue
+        open_elements.pop()
+        if len(open_elements) == 2:
+            yield (open_elements[-1].tag, element) if with_dataset else element
+            open_elements[-1].remove(element)
+
+
+def extract_unique_artists(xml_file, streaming=False, phase=None):
+    print("Extracting unique artists from the XML file...")
+    start = time.perf_counter()
 
+    artworks = (
+        iter_artworks_streaming(xml_file) if streaming else iter_artworks(xml_file)
+    )
+    artists = set()
+    count = 0
+
+    for artwork in artworks:
+        count += 1
+        artist = artwork.find("artist")
+        if artist is not None and artist.text:
+            artists.update(normalize_artist(artist.text))
+
+    elapsed = time.perf_counter() - start
+    print(
+        f"Processed {count} artworks in {elapsed:.1f}s "
+        f"({count / elapsed if elapsed else 0:.0f} artworks/s)"
+    )
+    cache = normalize_artist.cache_info()
+    print(f"Name cache: {cache.hits} hits, {cache.misses} misses")
+    if phase is not None:
+        phase.records = count
     return list(artists)
 
 
+@lru_cache(maxsize=CACHE_SIZE)
+def normalize_artist(artist_text):
+    """Cached `artist_names`, keyed on the raw <artist> text.
+
+    The same strings repeat across many artworks, so each distinct one is
+    parsed and normalized only once. Returns a tuple of names.
+    """
+    return tuple(artist_names(artist_text))
+
+
+def normalize_artist_column(artists):
+    """Normalize a pandas Series of <artist> strings at once.
+
+    Every distinct value is normalized once and the results are broadcast back
+    to the rows. Returns a Series of tuples of names aligned with `artists`;
+    missing values give an empty tuple.
+    """
+    codes, uniques = pd.factorize(artists)
+    # Missing values are factorized to -1, i.e. the last item
+    names = np.empty(len(uniques) + 1, dtype=object)
+    # Assign one by one so that numpy does not unpack the tuples
+    for i, artist_text in enumerate(uniques):
+        names[i] = normalize_artist(str(artist_text))
+    names[-1] = ()
+    return pd.Series(names[codes], index=artists.index)
+
+
+def artist_names(artist_text):
+    """Return the processed artist names of the <artist> text of an artwork."""
+    # Skip if the artist name is 'nan'
+    if artist_text.lower() == "nan":
+        return []
+
+    # Check if the artist text is a list representation
+    if artist_text.startswith("[") and artist_text.endswith("]"):
+        try:
+            artist_list = ast.literal_eval(artist_text)
+            # If the list length is 1, remove descriptors
+            remove_descriptor = len(artist_list) == 1
+            return [
+                process_artist_name(artist_item, remove_descriptor=remove_descriptor)
+                for artist_item in artist_list
+            ]
+        except (ValueError, SyntaxError):
+            # Handle cases where the string representation is not a valid list
+            return [process_artist_name(artist_text)]
+
+    # If the text is not a list, remove descriptors
+    return [process_artist_name(artist_text, remove_descriptor=True)]
+
+
 def process_artist_name(artist_text, remove_descriptor=False):
     # Split by colon to separate descriptors from the name
     parts = artist_text.split(":")
@@ -57,7 +130,7 @@ def process_artist_name(artist_text, remove_descriptor=False):
     artist_name = name_part.split("(")[0].strip()
 
     # Conditionally handle special characters if escape sequences are found
-    if re.search(r"\\u[0-9a-fA-F]{4}", artist_name):
+    if UNICODE_ESCAPE.search(artist_name):
         artist_name = artist_name.encode().decode("unicode_escape")
 
     # If the name is written as Surname, Name then it becomes Name Surname
@@ -79,15 +152,53 @@ def process_artist_name(artist_text, remove_descriptor=False):
 
 
 if __name__ == "__main__":
-    # xml file is two directories above the current file
-    xml_file_path = os.path.join(
-        os.path.dirname(os.path.dirname(__file__)), "merged_datasets.xml"
+    parser = argparse.ArgumentParser(
+        description="Extract the unique artists from the merged XML file."
+    )
+    parser.add_argument(
+        "--xml_file",
+        type=str,
+        # xml file is two directories above the current file
+        default=os.path.join(
+            os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+            "merged_datasets.xml",
+        ),
+        help="Path to the merged XML file.",
+    )
+    parser.add_argument(
+        "--output_file",
+        type=str,
+        default=os.path.join(
+            os.path.dirname(os.path.abspath(__file__)), "unique_artists.txt"
+        ),
+        help="Path to the text file the artists are saved to.",
+    )
+    parser.add_argument(
+        "--streaming",
+        action="store_true",
+        help="Parse the XML incrementally instead of loading the whole tree.",
+    )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="Profile the extraction to Datasets/reports (extract.prof).",
     )
-    unique_artists = extract_unique_artists(xml_file_path)
-    print(f"Total unique artists: {len(unique_artists)}")
-
-    # Save the list of artists to a text file
-    output_file = os.path.join(os.path.dirname(__file__), "unique_artists.txt")
-    with open(output_file, "w") as f:
-        for artist in unique_artists:
-            f.write(artist + "\n")
+    args = parser.parse_args()
+
+    with RunReport(
+        "Artists/extract_unique_artists", args.output_file, args.profile
+    ) as report:
+        with report.phase("extract", hot=True) as phase:
+            unique_artists = extract_unique_artists(
+                args.xml_file, args.streaming, phase
+            )
+            phase.read(args.xml_file)
+        print(f"Total unique artists: {len(unique_artists)}")
+
+        # Save the list of artists to a text file
+        with report.phase("write") as phase:
+            with open(args.output_file, "w") as f:
+                for artist in unique_artists:
+                    f.write(artist + "\n")
+            phase.records = len(unique_artists)
+            phase.wrote(args.output_file)
@@ -4,100 +4,145 @@ import pandas as pd
 import os
 import json
 from tqdm import tqdm
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
 
+from Datasets.instrumentation import RunReport, executor
 
-def main(root, csv_path=None):
 
-    if csv_path is None:
-        output_dir = os.path.join(os.path.dirname(root), "output")
-        if not os.path.exists(output_dir):
-            os.makedirs(output_dir)
-        csv_path = os.path.join(output_dir, "gac_metadata_final.csv")
+def process_artist(root, artist_dir):
+    """Collect the metadata records of every artwork of a single artist.
 
-    artists_directories = []
-    outer_dirs = [d for d in os.listdir(root) if os.path.isdir(os.path.join(root, d))]
-    for outer_dir in outer_dirs:
-        inner_dirs = [
-            d
-            for d in os.listdir(os.path.join(root, outer_dir))
-            if os.path.isdir(os.path.join(root, outer_dir, d))
-        ]
-        for inner_dir in inner_dirs:
-            artists_directories.append(os.path.join(outer_dir, inner_dir))
-
-    print(
-        f"Found {len(artists_directories)} artists in the root directory! Starting processing..."
-    )
+    Returns the records and the number of bytes read, or None if the artist
+    has no works directory.
+    """
+    works_path = os.path.join(root, artist_dir, "works")
 
-    # Initialize an empty DataFrame
-    gac_df = pd.DataFrame()
+    if not os.path.exists(works_path):
+        return None
 
-    artists_directories_tqdm = tqdm(artists_directories, desc="Processing artists...")
-    for artist_dir in artists_directories_tqdm:
-        artist_path = os.path.join(root, artist_dir)
-        works_path = os.path.join(artist_path, "works")
+    records = []
+    bytes_read = 0
+    artworks_directories = [
+        directory
+        for directory in os.listdir(works_path)
+        if os.path.isdir(os.path.join(works_path, directory))
+    ]
 
-        artist_name = " ".join(
-            os.path.basename(os.path.normpath(artist_dir)).split("_")
-        )
+    for artwork_dir in artworks_directories:
+        artwork_path = os.path.join(works_path, artwork_dir)
+        metadata_path = os.path.join(artwork_path, "metadata.json")
 
-        if os.path.exists(works_path):
+        if os.path.exists(metadata_path) and os.path.isfile(metadata_path):
+            with open(metadata_path, "rb") as file:
+                data = file.read()
+            bytes_read += len(data)
+            metadata = json.loads(data)
 
-            artworks_directories = [
-                directory
-                for directory in os.listdir(works_path)
-                if os.path.isdir(os.path.join(works_path, directory))
-            ]
+            # Add the artist and artwork directories to the metadata
+            metadata["artwork_path"] = f"{artist_dir}/{artwork_dir}"
+
+            # We have "date" and "date_created". Merge them under "date"
+            if not metadata.get("date", None):
+                metadata["date"] = metadata.get("date created", None)
+            # Remove "date_created" key
+            metadata.pop("date created", None)
+
+            # Replace whitespaces with underscores in the keys
+            metadata = {key.replace(" ", "_"): value for key, value in metadata.items()}
+
+            records.append(metadata)
+
+    return records, bytes_read
 
-            desc_str = (
-                f"Analyzing {len(artworks_directories)} artworks of {artist_name}..."
-            )
-            artists_directories_tqdm.set_description(desc_str)
-
-            for artwork_dir in artworks_directories:
-                artwork_path = os.path.join(works_path, artwork_dir)
-                metadata_path = os.path.join(artwork_path, "metadata.json")
-
-                if os.path.exists(metadata_path) and os.path.isfile(metadata_path):
-                    with open(metadata_path, "r") as file:
-                        metadata = json.load(file)
-
-                    # Add the artist and artwork directories to the metadata
-                    metadata["artwork_path"] = f"{artist_dir}/{artwork_dir}"
-
-                    # We have "date" and "date_created". Merge them under "date"
-                    if not metadata.get("date", None):
-                        metadata["date"] = metadata.get("date created", None)
-                    # Remove "date_created" key
-                    metadata.pop("date created", None)
-
-                    # Replace whitespaces with underscores in the keys
-                    metadata = {
-                        key.replace(" ", "_"): value for key, value in metadata.items()
-                    }
-
-                    # Append the metadata to the DataFrame
-                    gac_df = pd.concat(
-                        [gac_df, pd.DataFrame([metadata])], ignore_index=True
-                    )
-
-        else:
-            print(f"Works directory not found for artist {artist_name}")
-
-    # Serialize lists as JSON strings
-    for column in gac_df.columns:
-        gac_df[column] = gac_df[column].apply(
-            lambda x: json.dumps(x) if isinstance(x, list) else x
-        )
 
-    # display the resulting DataFrame
-    print(gac_df)
+def main(root, csv_path=None, workers=None, profile=False):
 
-    # Set the 'index' column as the DataFrame index
-    gac_df.set_index("id", inplace=True)
+    if csv_path is None:
+        output_dir = os.path.join(os.path.dirname(root), "output")
+        if not os.path.exists(output_dir):
+            os.makedirs(output_dir)
+        csv_path = os.path.join(output_dir, "gac_metadata_final.csv")
 
-    # Save the DataFrame to a CSV file
-    gac_df.to_csv(csv_path)
+    with RunReport("GAC/convert_metadata_to_csv", csv_path, profile) as report:
+        with report.phase("scan") as phase:
+            artists_directories = []
+            outer_dirs = [
+                d for d in os.listdir(root) if os.path.isdir(os.path.join(root, d))
+            ]
+            for outer_dir in outer_dirs:
+                inner_dirs = [
+                    d
+                    for d in os.listdir(os.path.join(root, outer_dir))
+                    if os.path.isdir(os.path.join(root, outer_dir, d))
+                ]
+                for inner_dir in inner_dirs:
+                    artists_directories.append(os.path.join(outer_dir, inner_dir))
+            phase.records = len(artists_directories)
+
+        print(
+            f"Found {len(artists_directories)} artists in the root directory! Starting processing..."
+        )
+
+        if workers is None:
+            workers = os.cpu_count() or 1
+
+        # Collect plain records and build the DataFrame once at the end. Results are
+        # consumed in submission order so the rows keep the same order as before.
+        records = []
+
+        with report.phase("parse", hot=True) as phase, executor(
+            ProcessPoolExecutor, profile, max_workers=workers
+        ) as pool:
+            results = pool.map(
+                process_artist,
+                repeat(root),
+                artists_directories,
+                chunksize=max(1, len(artists_directories) // (workers * 8)),
+            )
+
+            artists_directories_tqdm = tqdm(
+                zip(artists_directories, results),
+                total=len(artists_directories),
+                desc="Processing artists...",
+            )
+            for artist_dir, result in artists_directories_tqdm:
+                artist_name = " ".join(
+                    os.path.basename(os.path.normpath(artist_dir)).split("_")
+                )
+
+                if result is None:
+                    print(f"Works directory not found for artist {artist_name}")
+                    continue
+                artist_records, bytes_read = result
+
+                desc_str = (
+                    f"Analyzing {len(artist_records)} artworks of {artist_name}..."
+                )
+                artists_directories_tqdm.set_description(desc_str)
+                records.extend(artist_records)
+                phase.bytes_read += bytes_read
+            phase.records = len(records)
+
+        with report.phase("write") as phase:
+            gac_df = pd.DataFrame(records)
+
+            # Serialize lists as JSON strings
+            for column in gac_df.columns:
+                gac_df[column] = gac_df[column].apply(
+                    lambda x: json.dumps(x) if isinstance(x, list) else x
+                )
+
+            # display the resulting DataFrame
+            print(gac_df)
+
+            # Set the 'index' column as the DataFrame index
+            gac_df.set_index("id", inplace=True)
+
+            # Save the DataFrame to a CSV file
+            gac_df.to_csv(csv_path)
+            phase.records = len(gac_df)
+            phase.wrote(csv_path)
 
     """
     For reading the CSV file, we need to deserialize the JSON strings back to lists:
@@ -128,7 +173,19 @@ if __name__ == "__main__":
     parser.add_argument(
         "--csv_path", type=str, help="Path to save the resulting CSV file", default=None
     )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="Number of worker processes (defaults to the number of CPUs).",
+    )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="Profile the parsing, in a single process, to Datasets/reports "
+        "(parse.prof).",
+    )
 
     args = parser.parse_args()
 
-    main(args.root, args.csv_path)
+    main(args.root, args.csv_path, args.workers, args.profile)
@@ -0,0 +1,164 @@
+import asyncio
+import time
+
+import aiohttp
+
+# Status codes that signal the server wants us to slow down
+THROTTLE_STATUSES = {429, 503}
+
+
+class TokenBucket:
+    """Token-bucket rate limiter whose refill rate adapts to throttling.
+
+    The bucket starts at `rate` requests per second. Every 429/503 response
+    halves the rate (down to `min_rate`) and every successful response slowly
+    raises it again towards `max_rate`.
+    """
+
+    def __init__(self, rate=5.0, capacity=None, min_rate=0.2, max_rate=None):
+        self.rate = rate
+        self.min_rate = min_rate
+        self.max_rate = max_rate if max_rate is not None else rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self.lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self):
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                if now < self.blocked_until:
+                    await asyncio.sleep(self.blocked_until - now)
+                    continue
+                self._refill()
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+    def throttle(self, retry_after=None):
+        """Back off after a 429/503 response."""
+        # Responses to requests that were already in flight when we backed off
+        # should not halve the rate again
+        if time.monotonic() >= self.blocked_until:
+            self.rate = max(self.min_rate, self.rate / 2)
+        self.tokens = 0
+        delay = retry_after if retry_after is not None else 1 / self.rate
+        self.blocked_until = max(self.blocked_until, time.monotonic() + delay)
+
+    def success(self):
+        """Additively increase the rate after a successful response."""
+        self.rate = min(self.max_rate, self.rate + self.max_rate / 100)
+
+
+def parse_retry_after(value):
+    try:
+        return max(0.0, float(value))
+    except (TypeError, ValueError):
+        return None
+
+
+async def fetch_page(session, url, bucket, headers=None, retries=5):
+    """Fetch a page, backing off on 429/503 responses and network errors.
+
+    Returns the status, text, ETag and Last-Modified of the response.
+    """
+    for attempt in range(retries):
+        await bucket.acquire()
+        try:
+            async with session.get(url, headers=headers) as response:
+                if response.status in THROTTLE_STATUSES:
+                    bucket.throttle(
+                        parse_retry_after(response.headers.get("Retry-After"))
+                    )
+                    continue
+                text = await response.text()
+                bucket.success()
+                return (
+                    response.status,
+                    text,
+                    response.headers.get("ETag"),
+                    response.headers.get("Last-Modified"),
+                )
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            await asyncio.sleep(2**attempt)
+
+    raise RuntimeError(f"Failed to fetch {url} after {retries} attempts")
+
+
+async def fetch_cached(session, url, met_id, bucket, cache):
+    """Fetch a page, revalidating and updating its copy in the response cache."""
+    if cache is None:
+        return (await fetch_page(session, url, bucket))[1]
+
+    # The cache does blocking SQLite and gzip I/O, kept off the event loop
+    validators = await asyncio.to_thread(cache.validators, met_id)
+    status, html, etag, last_modified = await fetch_page(
+        session, url, bucket, validators
+    )
+    if status == 304:
+        cached = await asyncio.to_thread(cache.get, met_id)
+        if cached is not None:
+            return cached
+        status, html, etag, last_modified = await fetch_page(session, url, bucket)
+
+    if status < 400:
+        await asyncio.to_thread(cache.put, met_id, html, etag, last_modified)
+    return html
+
+
+async def crawl(
+    ids,
+    base_url,
+    parse,
+    on_result,
+    concurrency=20,
+    rate=5.0,
+    cache=None,
+    offline=False,
+):
+    """Fetch `base_url + id` for every id and hand the parsed page to `on_result`.
+
+    `parse(met_id, html)` runs in a thread so that parsing does not block the
+    event loop; `on_result(met_id, result)` is called from the event loop.
+    Pages that cannot be fetched are reported with a `None` result. With
+    `offline`, pages are only read from the response `cache`.
+    """
+    queue = asyncio.Queue()
+    for met_id in ids:
+        queue.put_nowait(met_id)
+
+    bucket = TokenBucket(rate=rate)
+    connector = aiohttp.TCPConnector(limit=concurrency, keepalive_timeout=60)
+    timeout = aiohttp.ClientTimeout(total=60)
+
+    async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+
+        async def worker():
+            while True:
+                try:
+                    met_id = queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+                try:
+                    if offline:
+                        html = await asyncio.to_thread(cache.get, met_id)
+                        if html is None:
+                            raise LookupError(f"{met_id} is not in the response cache")
+                    else:
+                        url = base_url + str(met_id)
+                        html = await fetch_cached(session, url, met_id, bucket, cache)
+                    result = await asyncio.to_thread(parse, met_id, html)
+                except Exception as exc:
+                    print(f"Failed to process {met_id}: {exc}")
+                    result = None
+                on_result(met_id, result)
+
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
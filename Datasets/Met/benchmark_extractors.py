@@ -0,0 +1,67 @@
+import argparse
+import os
+import time
+
+from Datasets.Met.extractors import EXTRACTORS
+from Datasets.Met.extract_metadata_concurrent import parse_props
+
+
+def load_fixtures(fixtures_dir):
+    pages = {}
+    for file in sorted(os.listdir(fixtures_dir)):
+        if file.endswith(".html"):
+            with open(os.path.join(fixtures_dir, file), "r", encoding="utf-8") as f:
+                pages[int(file.split(".")[0])] = f.read()
+    return pages
+
+
+def check_backends(pages):
+    """Check that every backend produces the same dicts as the reference."""
+    mismatches = 0
+    for met_id, html in pages.items():
+        reference = parse_props(met_id, html, "soup")
+        for extractor in EXTRACTORS:
+            if parse_props(met_id, html, extractor) != reference:
+                print(f"Mismatch for {met_id} with the '{extractor}' extractor")
+                mismatches += 1
+    return mismatches
+
+
+def benchmark(pages, extractor, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for met_id, html in pages.items():
+            parse_props(met_id, html, extractor)
+    elapsed = time.perf_counter() - start
+    return repeat * len(pages) / elapsed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Compare the Met HTML extractor backends on saved pages."
+    )
+    parser.add_argument(
+        "--fixtures",
+        type=str,
+        default=os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures"),
+        help="Directory containing the saved object pages (<met_id>.html)",
+    )
+    parser.add_argument(
+        "--repeat", type=int, default=50, help="Number of passes over the pages"
+    )
+    args = parser.parse_args()
+
+    pages = load_fixtures(args.fixtures)
+    print(f"Loaded {len(pages)} pages from {args.fixtures}")
+
+    mismatches = check_backends(pages)
+    if mismatches:
+        raise SystemExit(f"{mismatches} pages differ between the backends")
+    print("All backends produce identical dicts")
+
+    results = {
+        extractor: benchmark(pages, extractor, args.repeat) for extractor in EXTRACTORS
+    }
+    for extractor, pages_per_second in results.items():
+        speedup = pages_per_second / results["soup"]
+        print(f"{extractor:>6}: {pages_per_second:8.1f} pages/s ({speedup:.1f}x)")
@@ -0,0 +1,159 @@
+import argparse
+import asyncio
+import time
+from collections import Counter
+
+from aiohttp import web
+
+from Datasets.Met.async_crawler import crawl
+
+
+class StandInServer:
+    """Local stand-in for the Met website, rate limited and with flaky pages.
+
+    A request arriving when `limit` requests were already served in the last
+    second gets a 429 with a `Retry-After` header. The first request for every
+    `flaky_every`-th object is dropped without a response.
+    """
+
+    def __init__(self, limit, flaky_every, retry_after):
+        self.limit = limit
+        self.flaky_every = flaky_every
+        self.retry_after = retry_after
+        self.served = []
+        self.throttled = 0
+        self.attempts = Counter()
+
+    async def handle(self, request):
+        met_id = int(request.match_info["met_id"])
+        self.attempts[met_id] += 1
+        if met_id % self.flaky_every == 0 and self.attempts[met_id] == 1:
+            # The client sees the connection close before any response
+            request.transport.close()
+            return web.Response()
+
+        now = time.monotonic()
+        if sum(1 for served in self.served if served > now - 1) >= self.limit:
+            self.throttled += 1
+            return web.Response(
+                status=429, headers={"Retry-After": str(self.retry_after)}
+            )
+        self.served.append(now)
+        return web.Response(text=f"<html><h1>Object {met_id}</h1></html>")
+
+    def peak_rate(self):
+        """Highest number of requests served within one second."""
+        return max(
+            sum(1 for other in self.served if start <= other < start + 1)
+            for start in self.served
+        )
+
+
+async def run_check(pages, limit, rate, concurrency, flaky_every, retry_after):
+    server = StandInServer(limit, flaky_every, retry_after)
+    app = web.Application()
+    app.router.add_get("/{met_id}", server.handle)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    host, port = runner.addresses[0][:2]
+
+    results = {}
+    ids = list(range(1, pages + 1))
+    start = time.perf_counter()
+    try:
+        await crawl(
+            ids,
+            f"http://{host}:{port}/",
+            lambda met_id, html: html,
+            lambda met_id, result: results.__setitem__(met_id, result),
+            concurrency,
+            rate,
+        )
+    finally:
+        await runner.cleanup()
+    elapsed = time.perf_counter() - start
+
+    errors = []
+    missing = [met_id for met_id in ids if results.get(met_id) is None]
+    if missing:
+        errors.append(f"{len(missing)} pages were not fetched: {missing[:10]}")
+    wrong = [
+        met_id
+        for met_id, html in results.items()
+        if html is not None and f"Object {met_id}<" not in html
+    ]
+    if wrong:
+        errors.append(f"{len(wrong)} pages have the wrong content: {wrong[:10]}")
+    flaky = [met_id for met_id in ids if met_id % flaky_every == 0]
+    not_retried = [met_id for met_id in flaky if server.attempts[met_id] < 2]
+    if not_retried:
+        errors.append(f"Dropped requests were not retried: {not_retried[:10]}")
+
+    # The crawler starts above the limit, so it has to slow down to it
+    requests = sum(server.attempts.values())
+    if server.throttled == 0:
+        errors.append("The stand-in server never throttled the crawler")
+    elif server.throttled > 0.25 * requests:
+        errors.append(
+            f"{server.throttled} of {requests} requests were throttled: "
+            "the crawler did not back off"
+        )
+
+    print(
+        f"Fetched {len(ids) - len(missing)}/{len(ids)} pages in {elapsed:.1f}s "
+        f"({len(ids) / elapsed:.1f} pages/s, limit {limit}/s)"
+    )
+    print(
+        f"{requests} requests: {server.throttled} throttled, "
+        f"{len(flaky)} dropped and retried, "
+        f"peak of {server.peak_rate()} served in one second"
+    )
+    return errors
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Check the rate limiting and retries of the async crawler "
+        "against a local stand-in server."
+    )
+    parser.add_argument(
+        "--pages", type=int, default=100, help="Number of pages to crawl"
+    )
+    parser.add_argument(
+        "--limit", type=int, default=20, help="Requests/s served by the server"
+    )
+    parser.add_argument(
+        "--rate", type=float, default=40.0, help="Initial rate of the crawler"
+    )
+    parser.add_argument(
+        "--concurrency", type=int, default=10, help="In-flight requests"
+    )
+    parser.add_argument(
+        "--flaky_every",
+        type=int,
+        default=10,
+        help="Drop the first request for every n-th page",
+    )
+    parser.add_argument(
+        "--retry_after",
+        type=float,
+        default=0.5,
+        help="Retry-After of the 429 responses, in seconds",
+    )
+    args = parser.parse_args()
+
+    errors = asyncio.run(
+        run_check(
+            args.pages,
+            args.limit,
+            args.rate,
+            args.concurrency,
+            args.flaky_every,
+            args.retry_after,
+        )
+    )
+    if errors:
+        raise SystemExit("\n".join(errors))
+    print("The crawler respects the rate limit and retries dropped requests")
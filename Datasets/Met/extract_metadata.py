@@ -9,6 +9,8 @@ from bs4 import BeautifulSoup
 from time import sleep
 from tqdm import tqdm
 import argparse
+from Datasets.instrumentation import RunReport
+from Datasets.Met.response_cache import ResponseCache, fetch_page
 
 def get_args():
     parser = argparse.ArgumentParser(description='Fetch additional metadata from MET dataset.')
@@ -16,16 +18,30 @@ def get_args():
     parser.add_argument('--database', type=str)
     parser.add_argument('--outfile', type=str)
     parser.add_argument('--resume', default=-1, type=int)
+    parser.add_argument('--cache_dir', type=str, default=None,
+                        help='Directory of the on-disk response cache (disabled if not given)')
+    parser.add_argument('--cache_max_mb', type=int, default=None,
+                        help='Maximum size of the cached (compressed) pages in MB')
+    parser.add_argument('--offline', action='store_true',
+                        help='Only re-parse the pages in the cache, without any network access')
+    parser.add_argument('--profile', action='store_true',
+                        help='Profile the crawl to Datasets/reports (fetch.prof)')
  
 
     return parser
 
 
-def get_props(met_id):
+def get_props(met_id, cache=None, offline=False):
     url = 'https://www.metmuseum.org/art/collection/search/' + str(met_id)
 
-    requests.get(url)
-    soup = BeautifulSoup(requests.get(url).text, 'html.parser')
+    if offline:
+        html = cache.get(met_id)
+        if html is None:
+            # Evicted or lost since the cached pages were listed
+            return None
+    else:
+        html = fetch_page(requests, url, met_id, cache)
+    soup = BeautifulSoup(html, 'html.parser')
 
     # Initialize an empty dictionary to store label-value pairs
     artwork_info = {}
@@ -83,12 +99,13 @@ def get_props(met_id):
         
     artwork_info['keywords'] = keywords
     
-    sleep(random.uniform(0, 2))
+    if not offline:
+        sleep(random.uniform(0, 2))
 
     return artwork_info
 
 
-def fetch_dataset(database, outfile, resume=-1):
+def fetch_dataset(database, outfile, resume=-1, cache=None, offline=False):
     # Init empty dataframe
     new_data = pd.DataFrame()
 
@@ -97,13 +114,21 @@ def fetch_dataset(database, outfile, resume=-1):
     if resume > 0:
         res_index = filelist.index(resume) + 1
         filelist = filelist[res_index:]
+
+    if offline:
+        # Only the pages in the cache can be re-parsed
+        cached_ids = cache.ids()
+        filelist = [met_id for met_id in filelist if str(met_id) in cached_ids]
     
     for i, artwork in enumerate(tqdm(filelist)):
         # intermediate save
         if i % 5 == 0:
             save_data(new_data, outfile, artwork)
 
-        props = get_props(artwork)
+        props = get_props(artwork, cache, offline)
+        if props is None:
+            print(f'Skipped {artwork}: not in the response cache')
+            continue
         
         # concat props dictionary to new_data
         new_data = pd.concat([new_data, pd.DataFrame(props, index=[0])], ignore_index=True)
@@ -126,6 +151,21 @@ if __name__ == "__main__":
     # data_path = 'MET/'
     # database = 'ground_truth/mini_MET_database.json'
 
-    new_data = fetch_dataset(args.database, args.outfile, args.resume)
+    if args.offline and not args.cache_dir:
+        parser.error('--offline requires --cache_dir')
+
+    cache = None
+    if args.cache_dir:
+        max_size = args.cache_max_mb * 1024**2 if args.cache_max_mb else None
+        cache = ResponseCache(args.cache_dir, max_size)
+
+    with RunReport('Met/extract_metadata', args.outfile, args.profile) as report:
+        with report.phase('fetch', hot=True) as phase:
+            new_data = fetch_dataset(args.database, args.outfile, args.resume, cache, args.offline)
+            phase.records = len(new_data)
+            phase.read(args.database)
 
-    save_data(new_data, args.outfile)
+        with report.phase('save') as phase:
+            save_data(new_data, args.outfile)
+            phase.records = len(new_data)
+            phase.wrote(args.outfile)
@@ -1,15 +1,39 @@
 import json
 import pandas as pd
 import os
+import gzip
+import shutil
 import re
 import requests
 import random
-from bs4 import BeautifulSoup
 from time import sleep
 from tqdm import tqdm
 import argparse
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import ThreadPoolExecutor
 import threading
+import queue
+import time
+import asyncio
+from functools import partial
+
+from Datasets.instrumentation import RunReport, executor
+from Datasets.Met.extractors import EXTRACTORS
+from Datasets.Met.response_cache import ResponseCache, fetch_page
+
+MET_BASE_URL = "https://www.metmuseum.org/art/collection/search/"
+
+# Files written by the journal of every worker, appended to line by line
+JOURNAL_SUFFIXES = [
+    ".jsonl",
+    ".columns",
+    ".no_description",
+    ".no_details",
+    ".no_keywords",
+    ".failed_ids",
+]
+
+# One keep-alive session per worker thread
+thread_local = threading.local()
 
 
 def get_args():
@@ -22,153 +46,449 @@ def get_args():
     parser.add_argument(
         "--max_workers", type=int, default=5, help="Number of parallel workers"
     )
+    parser.add_argument(
+        "--mode",
+        choices=["threads", "async"],
+        default="threads",
+        help="Fetch pages with a thread pool or with the asyncio crawler",
+    )
+    parser.add_argument(
+        "--base_url",
+        type=str,
+        default=MET_BASE_URL,
+        help="URL prefix the object ID is appended to",
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=20,
+        help="Maximum number of in-flight requests in async mode",
+    )
+    parser.add_argument(
+        "--rate",
+        type=float,
+        default=5.0,
+        help="Initial request rate (requests/s) in async mode",
+    )
+    parser.add_argument(
+        "--extractor",
+        choices=sorted(EXTRACTORS),
+        default="fast",
+        help="HTML extractor backend ('soup' is the BeautifulSoup reference)",
+    )
+    parser.add_argument(
+        "--cache_dir",
+        type=str,
+        default=None,
+        help="Directory of the on-disk response cache (disabled if not given)",
+    )
+    parser.add_argument(
+        "--cache_max_mb",
+        type=int,
+        default=None,
+        help="Maximum size of the cached (compressed) pages in MB",
+    )
+    parser.add_argument(
+        "--offline",
+        action="store_true",
+        help="Only re-parse the pages in the cache, without any network access",
+    )
+    parser.add_argument(
+        "--compress",
+        action="store_true",
+        help="Also write a gzip-compressed copy of the output CSV",
+    )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="Profile the crawl, in a single thread, to Datasets/reports (fetch.prof)",
+    )
     return parser
 
 
-def get_props(met_id):
-    url = "https://www.metmuseum.org/art/collection/search/" + str(met_id)
-    soup = BeautifulSoup(requests.get(url).text, "html.parser")
+def get_session():
+    if not hasattr(thread_local, "session"):
+        thread_local.session = requests.Session()
+    return thread_local.session
+
+
+def get_props(
+    met_id, base_url=MET_BASE_URL, extractor="fast", cache=None, offline=False
+):
+    if offline:
+        html = cache.get(met_id)
+        if html is None:
+            # Evicted or lost since the cached pages were listed
+            raise LookupError(f"{met_id} is not in the response cache")
+        return parse_props(met_id, html, extractor)
+
+    html = fetch_page(get_session(), base_url + str(met_id), met_id, cache)
+    props = parse_props(met_id, html, extractor)
+    sleep(random.uniform(0, 2))
+    return props
+
+
+def parse_props(met_id, html, extractor="fast"):
+    description, artwork_items, keywords = EXTRACTORS[extractor](html)
 
     artwork_info = {"met_id": met_id}
     missing_info = {"no_description": [], "no_details": [], "no_keywords": []}
 
-    try:
-        description = soup.find(
-            "div", {"class": "artwork__intro__desc js-artwork__intro__desc"}
-        ).text
-    except:
+    if description is None:
         description = ""
         missing_info["no_description"].append(met_id)
     description = re.sub(r"\n", "", description)
     artwork_info["description"] = description
 
-    try:
-        details = soup.find("div", {"class": "show-more__body js-show-more__body"})
-        artwork_items = details.find_all("p", class_="artwork-tombstone--item")
-    except:
+    if artwork_items is None:
         artwork_items = []
         missing_info["no_details"].append(met_id)
 
-    for item in artwork_items:
-        label_span = item.find("span", class_="artwork-tombstone--label")
-        value_span = item.find("span", class_="artwork-tombstone--value")
-        try:
-            label = label_span.text.strip()[:-1]
-        except:
+    for label, value in artwork_items:
+        if label is None:
             continue
+        label = label.strip()[:-1]
         if label == "Classifications":
             label = "Classification"
-        value = value_span.text.strip()
+        value = value.strip()
         label = re.sub(r"\s", "_", label).lower()
         artwork_info[label] = value
 
-    try:
-        keywords = soup.find("meta", {"name": "keywords"})["content"]
-    except:
+    if keywords is None:
         keywords = ""
         missing_info["no_keywords"].append(met_id)
     artwork_info["keywords"] = keywords
 
-    sleep(random.uniform(0, 2))
     return artwork_info, missing_info
 
 
-def fetch_dataset(database, outfile, resume=-1, max_workers=5):
+def fetch_dataset(
+    database,
+    outfile,
+    resume=-1,
+    max_workers=5,
+    base_url=MET_BASE_URL,
+    extractor="fast",
+    cache=None,
+    offline=False,
+    compress=False,
+    profile=False,
+):
     filelist = sorted([entry["id"] for entry in json.load(open(database))])
 
     if resume > 0:
         res_index = filelist.index(resume) + 1
         filelist = filelist[res_index:]
 
+    if offline:
+        filelist = keep_cached(filelist, cache)
+
     # Create a tmp directory for temporary files
     tmp_dir = os.path.join(os.path.dirname(outfile), "tmp")
     os.makedirs(tmp_dir, exist_ok=True)
 
-    # Partition the filelist among workers
-    partitions = [filelist[i::max_workers] for i in range(max_workers)]
+    # Skip the artworks that are already in the journals of a previous run
+    filelist = skip_journaled(filelist, outfile, tmp_dir)
+
+    # Workers pull artworks from a shared queue, so a worker slowed down by
+    # slow pages or retries does not hold back the end of the crawl
+    work_queue = queue.Queue()
+    for met_id in filelist:
+        work_queue.put(met_id)
 
-    # Initialize a lock object
-    lock = threading.Lock()
+    total_bar = tqdm(total=len(filelist), desc="Total", position=0)
+    tqdm_bars = [
+        tqdm(desc=f"Worker {i+1}", position=i + 1, unit="page")
+        for i in range(max_workers)
+    ]
 
-    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+    with executor(ThreadPoolExecutor, profile, max_workers=max_workers) as pool:
         futures = []
-        tqdm_bars = [
-            tqdm(total=len(partition), desc=f"Worker {i+1}", position=i)
-            for i, partition in enumerate(partitions)
-        ]
-        for i, partition in enumerate(partitions):
+        for i in range(max_workers):
             futures.append(
-                executor.submit(
-                    process_partition,
-                    partition,
+                pool.submit(
+                    process_queue,
+                    work_queue,
                     f"{tmp_dir}/{os.path.basename(outfile)}.part{i}",
-                    lock,
                     tqdm_bars[i],
+                    total_bar,
+                    base_url,
+                    extractor,
+                    cache,
+                    offline,
                 )
             )
 
-        for future in as_completed(futures):
+        worker_stats = []
+        for future in futures:
             try:
-                future.result()
+                worker_stats.append(future.result())
             except Exception as exc:
                 print(f"Generated an exception: {exc}")
+                worker_stats.append((0, 0.0))
 
     # Close tqdm bars
-    for bar in tqdm_bars:
+    for bar in [total_bar] + tqdm_bars:
         bar.close()
 
+    # Report the throughput of every worker
+    for i, (count, elapsed) in enumerate(worker_stats):
+        rate = count / elapsed if elapsed else 0
+        print(f"Worker {i+1}: {count} pages in {elapsed:.1f}s ({rate:.2f} pages/s)")
+
     # Merge all parts into the final output file
-    merge_files(outfile, tmp_dir, max_workers)
+    rows = merge_files(outfile, tmp_dir, compress)
 
     # Merge missing info files
-    merge_missing_info_files(outfile, tmp_dir, max_workers)
+    merge_missing_info_files(outfile, tmp_dir)
 
     # Remove tmp directory
     os.rmdir(tmp_dir)
+    return rows
+
+
+def fetch_dataset_async(
+    database,
+    outfile,
+    resume=-1,
+    base_url=MET_BASE_URL,
+    concurrency=20,
+    rate=5.0,
+    extractor="fast",
+    cache=None,
+    offline=False,
+    compress=False,
+):
+    filelist = sorted([entry["id"] for entry in json.load(open(database))])
 
+    if resume > 0:
+        res_index = filelist.index(resume) + 1
+        filelist = filelist[res_index:]
 
-def process_partition(partition, outfile, lock, progress_bar):
-    new_data = pd.DataFrame()
-    missing_info = {"no_description": [], "no_details": [], "no_keywords": []}
+    if offline:
+        filelist = keep_cached(filelist, cache)
 
-    for i, artwork in enumerate(partition):
-        props, missing = get_props(artwork)
-        new_data = pd.concat(
-            [new_data, pd.DataFrame(props, index=[0])], ignore_index=True
+    tmp_dir = os.path.join(os.path.dirname(outfile), "tmp")
+    os.makedirs(tmp_dir, exist_ok=True)
+    filelist = skip_journaled(filelist, outfile, tmp_dir)
+
+    # aiohttp is only needed by the async mode
+    from Datasets.Met.async_crawler import crawl
+
+    progress_bar = tqdm(total=len(filelist), desc="Fetching")
+
+    with Journal(f"{tmp_dir}/{os.path.basename(outfile)}.part0") as journal:
+
+        def on_result(met_id, result):
+            if result is not None:
+                journal.append(*result)
+            else:
+                journal.fail(met_id)
+            progress_bar.update(1)
+
+        parse = partial(parse_props, extractor=extractor)
+        asyncio.run(
+            crawl(
+                filelist,
+                base_url,
+                parse,
+                on_result,
+                concurrency,
+                rate,
+                cache,
+                offline,
+            )
         )
-        for key in missing_info:
-            missing_info[key].extend(missing[key])
-
-        if i % 10 == 0:
-            with lock:
-                save_data(new_data, outfile)
-                save_missing_info(missing_info, outfile)
-                new_data = pd.DataFrame()  # Clear the dataframe after saving
-                missing_info = {
-                    "no_description": [],
-                    "no_details": [],
-                    "no_keywords": [],
-                }  # Clear the missing info
-
-        progress_bar.update(1)  # Update the progress bar
-
-    with lock:
-        save_data(new_data, outfile)
-        save_missing_info(missing_info, outfile)
-    progress_bar.update(
-        len(partition) - progress_bar.n
-    )  # Ensure the progress bar is complete
-
-
-def save_data(data, outfile):
-    if os.path.exists(outfile):
-        existing_data = pd.read_csv(outfile)
-        combined_data = pd.concat([existing_data, data], ignore_index=True).reset_index(
-            drop=True
+
+    progress_bar.close()
+
+    rows = merge_files(outfile, tmp_dir, compress)
+    merge_missing_info_files(outfile, tmp_dir)
+    os.rmdir(tmp_dir)
+    return rows
+
+
+def process_queue(
+    work_queue,
+    outfile,
+    progress_bar,
+    total_bar,
+    base_url=MET_BASE_URL,
+    extractor="fast",
+    cache=None,
+    offline=False,
+):
+    """Process artworks from the queue until it is empty.
+
+    Returns the number of processed artworks and the time spent on them.
+    """
+    count = 0
+    start = time.perf_counter()
+
+    with Journal(outfile) as journal:
+        while True:
+            try:
+                artwork = work_queue.get_nowait()
+            except queue.Empty:
+                break
+
+            try:
+                props, missing = get_props(artwork, base_url, extractor, cache, offline)
+                journal.append(props, missing)
+            except Exception as exc:
+                print(f"Failed to process {artwork}: {exc}")
+                journal.fail(artwork)
+
+            count += 1
+            progress_bar.update(1)  # Update the progress bars
+            total_bar.update(1)
+
+    return count, time.perf_counter() - start
+
+
+class Journal:
+    """Append-only JSONL journal of the fetched artworks of one worker.
+
+    Every line holds the properties of one artwork. Lines are buffered and
+    written (and fsynced) in batches of `sync_every` records; the missing info
+    of a batch is appended to the `.no_*` files once the batch is durable, and
+    the artworks that could not be processed to the `.failed_ids` file.
+    The keys seen in the journal are listed in a `.columns` file, so that the
+    merge can build the CSV header without reading the records.
+    """
+
+    def __init__(self, part_file, sync_every=10):
+        self.part_file = part_file
+        self.sync_every = sync_every
+        # After a crash, new lines must not be appended to a partial last line
+        for suffix in JOURNAL_SUFFIXES:
+            truncate_partial_line(f"{part_file}{suffix}")
+        self.handle = open(f"{part_file}.jsonl", "a", encoding="utf-8")
+        self.lines = []
+        self.missing_info = {"no_description": [], "no_details": [], "no_keywords": []}
+        self.failed = []
+        self.columns = set(read_columns(f"{part_file}.columns"))
+        self.new_columns = []
+
+    def append(self, props, missing):
+        self.lines.append(json.dumps(props, ensure_ascii=False) + "\n")
+        for key in props:
+            if key not in self.columns:
+                self.columns.add(key)
+                self.new_columns.append(key)
+        for key in self.missing_info:
+            self.missing_info[key].extend(missing[key])
+        if len(self.lines) >= self.sync_every:
+            self.flush()
+
+    def fail(self, met_id):
+        self.failed.append(met_id)
+
+    def flush(self):
+        # The columns are made durable before the records that use them
+        if self.new_columns:
+            with open(f"{self.part_file}.columns", "a", encoding="utf-8") as f:
+                f.write("".join(f"{column}\n" for column in self.new_columns))
+                f.flush()
+                os.fsync(f.fileno())
+            self.new_columns = []
+        if self.lines:
+            self.handle.write("".join(self.lines))
+            self.handle.flush()
+            os.fsync(self.handle.fileno())
+            self.lines = []
+        save_missing_info(
+            {**self.missing_info, "failed_ids": self.failed}, self.part_file
         )
-        combined_data.to_csv(outfile, index=False)
-    else:
-        data.to_csv(outfile, index=False)
+        self.missing_info = {"no_description": [], "no_details": [], "no_keywords": []}
+        self.failed = []
+
+    def close(self):
+        self.flush()
+        self.handle.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def truncate_partial_line(path):
+    """Cut a partially written last line, left by a crash, from a file."""
+    if not os.path.exists(path):
+        return
+    with open(path, "rb+") as f:
+        end = position = f.seek(0, os.SEEK_END)
+        while position > 0:
+            block = min(position, 64 * 1024)
+            f.seek(position - block)
+            newline = f.read(block).rfind(b"\n")
+            if newline != -1:
+                position += newline + 1 - block
+                break
+            position -= block
+        if position != end:
+            f.truncate(position)
+
+
+def read_journal(journal_file):
+    """Yield the records of a journal, skipping the lines that do not decode.
+
+    The artworks of these lines are not counted as done by `skip_journaled`,
+    so they are fetched again.
+    """
+    with open(journal_file, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                continue
+
+
+def read_columns(columns_file):
+    if not os.path.exists(columns_file):
+        return []
+    with open(columns_file, "r", encoding="utf-8") as f:
+        return [line.rstrip("\n") for line in f if line.strip()]
+
+
+def part_files(outfile, tmp_dir, suffix):
+    """Return the existing part files with the given suffix, ordered by part."""
+    prefix = f"{os.path.basename(outfile)}.part"
+    parts = []
+    for file in os.listdir(tmp_dir):
+        if file.startswith(prefix) and file.endswith(suffix):
+            part = file[len(prefix) : len(file) - len(suffix)]
+            if part.isdigit():
+                parts.append((int(part), os.path.join(tmp_dir, file)))
+    return [path for _, path in sorted(parts)]
+
+
+def keep_cached(filelist, cache):
+    cached_ids = cache.ids()
+    cached = [met_id for met_id in filelist if str(met_id) in cached_ids]
+    print(f"Offline mode: {len(cached)} of {len(filelist)} artworks are cached")
+    return cached
+
+
+def skip_journaled(filelist, outfile, tmp_dir):
+    # Also repair the parts of workers that this run will not reopen
+    for suffix in JOURNAL_SUFFIXES:
+        for part_file in part_files(outfile, tmp_dir, suffix):
+            truncate_partial_line(part_file)
+
+    # The failed artworks are not in the journals, so this run retries them
+    for part_file in part_files(outfile, tmp_dir, ".failed_ids"):
+        os.remove(part_file)
+
+    done = set()
+    for journal_file in part_files(outfile, tmp_dir, ".jsonl"):
+        done.update(record["met_id"] for record in read_journal(journal_file))
+
+    if done:
+        print(f"Skipping {len(done)} artworks found in the journals")
+    return [met_id for met_id in filelist if met_id not in done]
 
 
 def save_missing_info(missing_info, outfile):
@@ -179,51 +499,122 @@ def save_missing_info(missing_info, outfile):
                 f.write(f"{id}\n")
 
 
-def merge_files(outfile, tmp_dir, parts):
-    all_columns = set()
+def merge_files(outfile, tmp_dir, compress=False, chunk_size=10000):
+    """Stream the journals into the final CSV (and optionally a gzip copy).
 
-    # Collect all columns from all parts
-    for i in range(parts):
-        part_file = f"{tmp_dir}/{os.path.basename(outfile)}.part{i}"
-        if os.path.exists(part_file):
-            df = pd.read_csv(part_file)
-            all_columns.update(df.columns)
+    The column union is built from the `.columns` files only, then records are
+    written in chunks, so memory use does not depend on the size of the crawl.
+    Returns the number of records written.
+    """
+    journal_files = part_files(outfile, tmp_dir, ".jsonl")
 
-    all_columns = sorted(list(all_columns))
-
-    with open(outfile, "w") as outfile_handle:
+    all_columns = set()
+    for journal_file in journal_files:
+        columns_file = journal_file[: -len(".jsonl")] + ".columns"
+        if os.path.exists(columns_file):
+            all_columns.update(read_columns(columns_file))
+        else:
+            # Journals written without a columns file have to be scanned
+            for record in read_journal(journal_file):
+                all_columns.update(record)
+    all_columns = sorted(all_columns)
+
+    handles = [open(outfile, "w")]
+    if compress:
+        handles.append(gzip.open(f"{outfile}.gz", "wt"))
+
+    def write_chunk(chunk, header):
+        # No per-chunk type inference, so a value is written the same way
+        # whichever chunk it is in
+        df = pd.DataFrame(chunk, columns=all_columns, dtype=object)
+        for handle in handles:
+            df.to_csv(handle, index=False, header=header)
+
+    rows = 0
+    try:
+        chunk = []
         header_written = False
-        for i in range(parts):
-            part_file = f"{tmp_dir}/{os.path.basename(outfile)}.part{i}"
-            if os.path.exists(part_file):
-                df = pd.read_csv(part_file)
-                df = df.reindex(columns=all_columns)
-                if not header_written:
-                    df.to_csv(outfile_handle, index=False)
+        for journal_file in journal_files:
+            for record in read_journal(journal_file):
+                chunk.append(record)
+                rows += 1
+                if len(chunk) >= chunk_size:
+                    write_chunk(chunk, not header_written)
                     header_written = True
-                else:
-                    df.to_csv(outfile_handle, index=False, header=False)
-                os.remove(part_file)  # Clean up part file
-
-
-def merge_missing_info_files(outfile, tmp_dir, parts):
-    for key in ["no_description", "no_details", "no_keywords"]:
+                    chunk = []
+        if chunk or not header_written:
+            write_chunk(chunk, not header_written)
+    finally:
+        for handle in handles:
+            handle.close()
+
+    for journal_file in journal_files:
+        os.remove(journal_file)  # Clean up journal file
+        columns_file = journal_file[: -len(".jsonl")] + ".columns"
+        if os.path.exists(columns_file):
+            os.remove(columns_file)
+    return rows
+
+
+def merge_missing_info_files(outfile, tmp_dir):
+    for key in ["no_description", "no_details", "no_keywords", "failed_ids"]:
         merged_file = f"{outfile}.{key}"
         with open(merged_file, "w") as outfile_handle:
-            for i in range(parts):
-                part_file = f"{tmp_dir}/{os.path.basename(outfile)}.part{i}.{key}"
-                if os.path.exists(part_file):
-                    with open(part_file, "r") as part_handle:
-                        while True:
-                            line = part_handle.readline()
-                            if not line:
-                                break
-                            outfile_handle.write(line)
-                    os.remove(part_file)  # Clean up part file
+            for part_file in part_files(outfile, tmp_dir, f".{key}"):
+                with open(part_file, "r") as part_handle:
+                    shutil.copyfileobj(part_handle, outfile_handle, 1024 * 1024)
+                os.remove(part_file)  # Clean up part file
+
+    with open(f"{outfile}.failed_ids", "r") as f:
+        failed = sum(1 for _ in f)
+    if failed:
+        print(f"{failed} artworks failed, their IDs are in '{outfile}.failed_ids'")
 
 
 if __name__ == "__main__":
     parser = get_args()
     args = parser.parse_args()
 
-    fetch_dataset(args.database, args.outfile, args.resume, args.max_workers)
+    if args.offline and not args.cache_dir:
+        parser.error("--offline requires --cache_dir")
+
+    cache = None
+    if args.cache_dir:
+        max_size = args.cache_max_mb * 1024**2 if args.cache_max_mb else None
+        cache = ResponseCache(args.cache_dir, max_size)
+
+    with RunReport(
+        "Met/extract_metadata_concurrent", args.outfile, args.profile
+    ) as report:
+        with report.phase("fetch", hot=True) as phase:
+            if args.mode == "async":
+                phase.records = fetch_dataset_async(
+                    args.database,
+                    args.outfile,
+                    args.resume,
+                    args.base_url,
+                    args.concurrency,
+                    args.rate,
+                    args.extractor,
+                    cache,
+                    args.offline,
+                    args.compress,
+                )
+            else:
+                phase.records = fetch_dataset(
+                    args.database,
+                    args.outfile,
+                    args.resume,
+                    args.max_workers,
+                    args.base_url,
+                    args.extractor,
+                    cache,
+                    args.offline,
+                    args.compress,
+                    args.profile,
+                )
+            phase.read(args.database)
+            phase.wrote(args.outfile)
+
+    if cache is not None:
+        cache.close()
@@ -0,0 +1,220 @@
+from html.parser import HTMLParser
+
+from bs4 import BeautifulSoup
+
+DESCRIPTION_CLASS = "artwork__intro__desc js-artwork__intro__desc"
+DETAILS_CLASS = "show-more__body js-show-more__body"
+ITEM_CLASS = "artwork-tombstone--item"
+LABEL_CLASS = "artwork-tombstone--label"
+VALUE_CLASS = "artwork-tombstone--value"
+ASCII_SPACES = "\x20\x0a\x09\x0c\x0d"
+# Tags whose text BeautifulSoup keeps apart from the text of their parents
+HIDDEN_TEXT_TAGS = ("template", "rt", "rp")
+
+# An extractor takes the HTML of a Met object page and returns a tuple
+# (description, items, keywords):
+#   - description: text of the intro description div, None if missing
+#   - items: list of (label, value) texts of the tombstone items, None if the
+#     details section is missing. label/value are None when the span is missing
+#   - keywords: content of the keywords meta tag, None if missing
+
+
+def extract_soup(html):
+    """Reference extractor building a full BeautifulSoup tree."""
+    soup = BeautifulSoup(html, "html.parser")
+
+    description = soup.find("div", {"class": DESCRIPTION_CLASS})
+    if description is not None:
+        description = description.text
+
+    details = soup.find("div", {"class": DETAILS_CLASS})
+    items = None
+    if details is not None:
+        items = []
+        for item in details.find_all("p", class_=ITEM_CLASS):
+            label_span = item.find("span", class_=LABEL_CLASS)
+            value_span = item.find("span", class_=VALUE_CLASS)
+            items.append(
+                (
+                    label_span.text if label_span is not None else None,
+                    value_span.text if value_span is not None else None,
+                )
+            )
+
+    keywords = soup.find("meta", {"name": "keywords"})
+    if keywords is not None:
+        keywords = keywords.get("content")
+
+    return description, items, keywords
+
+
+class FastExtractor(HTMLParser):
+    """Event-based extractor that only keeps the text of the fields we need.
+
+    The page is fed in chunks and parsing stops as soon as the description,
+    the keywords and the whole tombstone section have been seen.
+    """
+
+    chunk_size = 16384
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.description = None
+        self.description_depth = 0
+        self.description_done = False
+        self.items = None
+        self.details_depth = 0
+        self.details_done = False
+        self.item = None
+        self.span = None
+        self.span_depth = 0
+        self.keywords = None
+        self.keywords_done = False
+        self.skip_depth = 0
+        self.hidden_depth = 0
+        self.preserve_depth = 0
+        self.pending = []
+
+    @property
+    def done(self):
+        return self.description_done and self.details_done and self.keywords_done
+
+    def extract(self, html):
+        for start in range(0, len(html), self.chunk_size):
+            self.feed(html[start : start + self.chunk_size])
+            if self.done:
+                break
+        else:
+            self.close()
+            self.flush_data()
+        return self.description, self.items, self.keywords
+
+    def flush_data(self):
+        """Hand the text node collected since the last tag to the open fields.
+
+        Like BeautifulSoup, a text node made only of ASCII whitespace is
+        collapsed to a single newline or space outside <pre>/<textarea>.
+        """
+        if not self.pending:
+            return
+        data = "".join(self.pending)
+        self.pending = []
+        if not self.preserve_depth and not data.strip(ASCII_SPACES):
+            data = "\n" if "\n" in data else " "
+        if self.description_depth:
+            self.description += data
+        if self.span is not None:
+            self.item[self.span] += data
+
+    def handle_starttag(self, tag, attrs):
+        self.flush_data()
+        if tag in ("pre", "textarea"):
+            self.preserve_depth += 1
+        if tag in HIDDEN_TEXT_TAGS:
+            self.hidden_depth += 1
+        if tag in ("script", "style"):
+            self.skip_depth += 1
+            return
+
+        if tag == "meta" and not self.keywords_done:
+            attrs = dict(attrs)
+            if attrs.get("name") == "keywords":
+                self.keywords = attrs.get("content")
+                self.keywords_done = True
+            return
+
+        if tag == "div":
+            classes = " ".join((dict(attrs).get("class") or "").split())
+            if self.description_depth:
+                self.description_depth += 1
+            elif not self.description_done and classes == DESCRIPTION_CLASS:
+                self.description = ""
+                self.description_depth = 1
+            if self.details_depth:
+                self.details_depth += 1
+            elif not self.details_done and classes == DETAILS_CLASS:
+                self.items = []
+                self.details_depth = 1
+            return
+
+        if not self.details_depth:
+            return
+
+        if tag == "p":
+            if ITEM_CLASS in (dict(attrs).get("class") or "").split():
+                # The </p> of the previous item may be omitted
+                self.close_item()
+                self.item = {}
+        elif tag == "span" and self.item is not None:
+            if self.span is not None:
+                self.span_depth += 1
+                return
+            classes = (dict(attrs).get("class") or "").split()
+            for key, span_class in (("label", LABEL_CLASS), ("value", VALUE_CLASS)):
+                if span_class in classes and key not in self.item:
+                    self.item[key] = ""
+                    self.span = key
+                    self.span_depth = 1
+                    break
+
+    def handle_startendtag(self, tag, attrs):
+        # Self-closing tags never contain text
+        self.handle_starttag(tag, attrs)
+        if tag != "meta":
+            self.handle_endtag(tag)
+
+    def handle_endtag(self, tag):
+        self.flush_data()
+        if tag in ("pre", "textarea"):
+            self.preserve_depth = max(0, self.preserve_depth - 1)
+        if tag in HIDDEN_TEXT_TAGS:
+            self.hidden_depth = max(0, self.hidden_depth - 1)
+        if tag in ("script", "style"):
+            self.skip_depth = max(0, self.skip_depth - 1)
+            return
+
+        if tag == "div":
+            if self.description_depth:
+                self.description_depth -= 1
+                if not self.description_depth:
+                    self.description_done = True
+            if self.details_depth:
+                self.details_depth -= 1
+                if not self.details_depth:
+                    self.close_item()
+                    self.details_done = True
+        elif tag == "span" and self.span is not None:
+            self.span_depth -= 1
+            if not self.span_depth:
+                self.span = None
+        elif tag == "p" and self.item is not None:
+            self.close_item()
+
+    def close_item(self):
+        if self.item is not None:
+            self.items.append((self.item.get("label"), self.item.get("value")))
+            self.item = None
+            self.span = None
+
+    def handle_data(self, data):
+        # A text node can be reported in several pieces, e.g. across chunks
+        if not self.skip_depth and not self.hidden_depth:
+            self.pending.append(data)
+
+    def handle_comment(self, data):
+        self.flush_data()
+
+    def unknown_decl(self, data):
+        # A CDATA section is a text node of its own
+        self.flush_data()
+        if data.upper().startswith("CDATA["):
+            self.handle_data(data[len("CDATA[") :])
+            self.flush_data()
+
+
+def extract_fast(html):
+    """Extract the fields with the event-based parser."""
+    return FastExtractor().extract(html)
+
+
+EXTRACTORS = {"soup": extract_soup, "fast": extract_fast}
@@ -1,33 +1,125 @@
 import os
+import time
+import argparse
+from collections import deque
+from itertools import islice
+from concurrent.futures import ThreadPoolExecutor
 import pandas as pd
 
+from Datasets.instrumentation import RunReport, executor
 
-def merge_metadata_files(metadata_directory, output_file="met_metadata_final.csv"):
+
+def unified_columns(paths):
+    """Union of the chunk columns, in the order in which they first appear.
+
+    Only the header of every chunk is read.
+    """
+    columns = {}
+    for path in paths:
+        columns.update(dict.fromkeys(pd.read_csv(path, nrows=0).columns))
+    return list(columns)
+
+
+def read_chunk(path, columns):
+    # Keep the values verbatim: no type inference, no missing values
+    df = pd.read_csv(path, dtype=str, keep_default_na=False)
+    return df.reindex(columns=columns)
+
+
+def merge_metadata_files(
+    metadata_directory, output_file="met_metadata_final.csv", workers=4, profile=False
+):
+    """Concatenate the Met chunk CSVs into a single file.
+
+    The chunks are merged in the order of their file names and their rows are
+    copied verbatim under the union of their columns. Chunks are read by
+    `workers` threads ahead of the writer, so at most `workers + 1` chunks are
+    in memory at any time, however many chunks there are.
+    """
 
     # Get all the csv files in the directory
-    file_names = [
+    file_names = sorted(
         file for file in os.listdir(metadata_directory) if file.endswith(".csv")
-    ]
+    )
 
     print(f"Found {len(file_names)} CSV files!")
+    if not file_names:
+        return
 
-    # Read and concatenate the DataFrames
-    dataframes = [
-        pd.read_csv(os.path.join(metadata_directory, file)) for file in file_names
-    ]
+    paths = [os.path.join(metadata_directory, file) for file in file_names]
+    output_path = os.path.join(os.path.dirname(__file__), "output", output_file)
 
-    # Merge all DataFrames
-    merged_df = pd.concat(dataframes, axis=0, ignore_index=True)
+    with RunReport("Met/merge_metadata_files", output_path, profile) as report:
+        with report.phase("columns") as phase:
+            columns = unified_columns(paths)
+            phase.records = len(paths)
 
-    # Save the merged DataFrame to a new CSV file
-    merged_df.to_csv(
-        os.path.join(os.path.dirname(__file__), "output", output_file), index=False
-    )
+        start = time.perf_counter()
+        rows = 0
+        with report.phase("merge", hot=True) as phase:
+            with executor(
+                ThreadPoolExecutor, profile, max_workers=workers
+            ) as pool, open(output_path, "w", encoding="utf-8", newline="") as f:
+                remaining = iter(paths)
+                header_written = False
+                pending = deque(
+                    pool.submit(read_chunk, path, columns)
+                    for path in islice(remaining, workers)
+                )
+                while pending:
+                    df = pending.popleft().result()
+                    # Prefetch the next chunk while this one is written
+                    path = next(remaining, None)
+                    if path is not None:
+                        pending.append(pool.submit(read_chunk, path, columns))
 
-    print(f"Merged CSV file saved as '{output_file}'")
+                    # The header goes before the first chunk, even if it is empty
+                    df.to_csv(f, header=not header_written, index=False)
+                    header_written = True
+                    rows += len(df)
+
+            phase.records = rows
+            phase.read(*paths)
+            phase.wrote(output_path)
+
+        elapsed = time.perf_counter() - start
+        print(
+            f"Merged {rows} rows with {len(columns)} columns in {elapsed:.1f}s "
+            f"({rows / elapsed if elapsed else 0:.0f} rows/s)"
+        )
+        print(f"Merged CSV file saved as '{output_file}'")
 
 
 if __name__ == "__main__":
     # parent directory of the current file
     current_directory = os.path.dirname(__file__)
-    merge_metadata_files(os.path.join(current_directory, "data/MET chunks"))
+
+    parser = argparse.ArgumentParser(description="Merge the Met chunk CSV files.")
+    parser.add_argument(
+        "--metadata_directory",
+        type=str,
+        default=os.path.join(current_directory, "data/MET chunks"),
+        help="Directory containing the chunk CSV files.",
+    )
+    parser.add_argument(
+        "--output_file",
+        type=str,
+        default="met_metadata_final.csv",
+        help="Name of the merged CSV file, saved in the output directory.",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=4,
+        help="Number of chunks read ahead in parallel.",
+    )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="Profile the merge, in a single thread, to Datasets/reports (merge.prof).",
+    )
+    args = parser.parse_args()
+
+    merge_metadata_files(
+        args.metadata_directory, args.output_file, args.workers, args.profile
+    )
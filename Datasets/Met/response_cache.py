@@ -0,0 +1,207 @@
+import gzip
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+
+# Number of reads whose access times are written to the index in one batch
+ACCESS_BATCH = 100
+
+
+class ResponseCache:
+    """Content-addressed, gzip-compressed cache of Met object pages.
+
+    Page bodies are stored once per content hash under `objects/`, and an
+    SQLite index maps each Met object ID to its body together with the ETag
+    and Last-Modified validators of the response. When `max_size` (bytes of
+    compressed bodies) is exceeded, the least recently used entries are
+    evicted. Access times are recorded in memory and written in batches. The
+    cache can be shared by the threads of a crawl.
+    """
+
+    def __init__(self, cache_dir, max_size=None):
+        self.cache_dir = cache_dir
+        self.objects_dir = os.path.join(cache_dir, "objects")
+        self.max_size = max_size
+        os.makedirs(self.objects_dir, exist_ok=True)
+
+        self.lock = threading.Lock()
+        self.accessed = {}
+        self.db = sqlite3.connect(
+            os.path.join(cache_dir, "index.sqlite"), check_same_thread=False
+        )
+        self.db.executescript("""
+            CREATE TABLE IF NOT EXISTS entries (
+                met_id TEXT PRIMARY KEY,
+                digest TEXT NOT NULL,
+                etag TEXT,
+                last_modified TEXT,
+                accessed REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS blobs (
+                digest TEXT PRIMARY KEY,
+                size INTEGER NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed);
+            """)
+        self.size = self.db.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM blobs"
+        ).fetchone()[0]
+
+    def _blob_path(self, digest):
+        return os.path.join(self.objects_dir, digest[:2], f"{digest}.gz")
+
+    def __contains__(self, met_id):
+        with self.lock:
+            row = self.db.execute(
+                "SELECT 1 FROM entries WHERE met_id = ?", (str(met_id),)
+            ).fetchone()
+        return row is not None
+
+    def ids(self):
+        with self.lock:
+            return {row[0] for row in self.db.execute("SELECT met_id FROM entries")}
+
+    def validators(self, met_id):
+        """Return the conditional request headers for a cached page."""
+        with self.lock:
+            row = self.db.execute(
+                "SELECT etag, last_modified FROM entries WHERE met_id = ?",
+                (str(met_id),),
+            ).fetchone()
+        headers = {}
+        if row is not None:
+            if row[0]:
+                headers["If-None-Match"] = row[0]
+            if row[1]:
+                headers["If-Modified-Since"] = row[1]
+        return headers
+
+    def get(self, met_id):
+        """Return the cached page of an object, or None if it is not cached."""
+        with self.lock:
+            row = self.db.execute(
+                "SELECT digest FROM entries WHERE met_id = ?", (str(met_id),)
+            ).fetchone()
+            if row is None:
+                return None
+            self.accessed[str(met_id)] = time.time()
+            if len(self.accessed) >= ACCESS_BATCH:
+                self._write_accessed()
+                self.db.commit()
+
+        try:
+            with gzip.open(self._blob_path(row[0]), "rt", encoding="utf-8") as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def put(self, met_id, html, etag=None, last_modified=None):
+        data = html.encode("utf-8")
+        digest = hashlib.sha256(data).hexdigest()
+        blob_path = self._blob_path(digest)
+
+        with self.lock:
+            known = self.db.execute(
+                "SELECT 1 FROM blobs WHERE digest = ?", (digest,)
+            ).fetchone()
+            if known is None:
+                os.makedirs(os.path.dirname(blob_path), exist_ok=True)
+                compressed = gzip.compress(data)
+                # Write to a temporary file first so readers never see a partial blob
+                tmp_path = f"{blob_path}.{threading.get_ident()}.tmp"
+                with open(tmp_path, "wb") as f:
+                    f.write(compressed)
+                os.replace(tmp_path, blob_path)
+                self.db.execute(
+                    "INSERT INTO blobs (digest, size) VALUES (?, ?)",
+                    (digest, len(compressed)),
+                )
+                self.size += len(compressed)
+
+            self.accessed.pop(str(met_id), None)
+            previous = self.db.execute(
+                "SELECT digest FROM entries WHERE met_id = ?", (str(met_id),)
+            ).fetchone()
+            self.db.execute(
+                "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?)",
+                (str(met_id), digest, etag, last_modified, time.time()),
+            )
+            if previous is not None and previous[0] != digest:
+                self._drop_unreferenced(previous[0])
+
+            if self.max_size is not None:
+                # The eviction order needs the recent access times
+                self._write_accessed()
+                self._evict(keep=str(met_id))
+            self.db.commit()
+
+    def _write_accessed(self):
+        if self.accessed:
+            self.db.executemany(
+                "UPDATE entries SET accessed = ? WHERE met_id = ?",
+                [(accessed, met_id) for met_id, accessed in self.accessed.items()],
+            )
+            self.accessed = {}
+
+    def _drop_unreferenced(self, digest):
+        referenced = self.db.execute(
+            "SELECT 1 FROM entries WHERE digest = ? LIMIT 1", (digest,)
+        ).fetchone()
+        if referenced is not None:
+            return
+        size = self.db.execute(
+            "SELECT size FROM blobs WHERE digest = ?", (digest,)
+        ).fetchone()
+        self.db.execute("DELETE FROM blobs WHERE digest = ?", (digest,))
+        if size is not None:
+            self.size -= size[0]
+        try:
+            os.remove(self._blob_path(digest))
+        except FileNotFoundError:
+            pass
+
+    def _evict(self, keep=None):
+        while self.size > self.max_size:
+            row = self.db.execute(
+                "SELECT met_id, digest FROM entries WHERE met_id != ? "
+                "ORDER BY accessed LIMIT 1",
+                (keep,),
+            ).fetchone()
+            if row is None:
+                break
+            self.db.execute("DELETE FROM entries WHERE met_id = ?", (row[0],))
+            self._drop_unreferenced(row[1])
+
+    def close(self):
+        with self.lock:
+            self._write_accessed()
+            self.db.commit()
+            self.db.close()
+
+
+def fetch_page(session, url, met_id, cache=None):
+    """Fetch a page with `requests`, revalidating the cached copy if there is one.
+
+    Returns the page text. A 304 response is served from the cache, any other
+    successful response is stored in it.
+    """
+    headers = cache.validators(met_id) if cache is not None else {}
+    response = session.get(url, headers=headers)
+
+    if response.status_code == 304 and cache is not None:
+        html = cache.get(met_id)
+        if html is not None:
+            return html
+        response = session.get(url)
+
+    html = response.text
+    if cache is not None and response.ok:
+        cache.put(
+            met_id,
+            html,
+            response.headers.get("ETag"),
+            response.headers.get("Last-Modified"),
+        )
+    return html
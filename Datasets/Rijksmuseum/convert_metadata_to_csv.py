@@ -1,93 +1,167 @@
 import argparse
-import xml.etree.ElementTree as ET
+from xml.parsers import expat
 import pandas as pd
 import os
 import json
+import time
 from tqdm import tqdm
+from concurrent.futures import ProcessPoolExecutor
 
+from Datasets.instrumentation import RunReport, executor
 
-def main(xml_path, csv_path=None):
+# Qualified name of the element holding the Dublin Core fields. The record
+# files use the "oai_dc" and "dc" prefixes without declaring them, so they are
+# parsed without namespace processing and matched on the prefixed names.
+DC_ELEMENT = "oai_dc:dc"
 
-    if csv_path is None:
-        output_dir = os.path.join(os.path.dirname(os.path.dirname(xml_path)), "output")
-        if not os.path.exists(output_dir):
-            os.makedirs(output_dir)
-        csv_path = os.path.join(output_dir, "rijksmuseum_metadata_final.csv")
-
-    namespaces = {
-        "oai_dc": "http://www.openarchives.org/OAI/2.0/oai_dc/",
-        "dc": "http://purl.org/dc/elements/1.1/",
-    }
 
-    xml_files = [file for file in os.listdir(xml_path) if file.endswith(".xml")]
+def parse_record(xml_file_path):
+    """Extract the Dublin Core fields of a single OAI-DC record file.
 
-    print(f"Found {len(xml_files)} XML files in the directory! Extracting metadata...")
-
-    # Initialize an empty DataFrame
-    rijksmuseum_df = pd.DataFrame()
-
-    for xml_file in tqdm(xml_files, desc="Processing XML files"):
-        xml_file_path = os.path.join(xml_path, xml_file)
+    Returns the fields and the number of bytes read.
+    """
+    xml_file = os.path.basename(xml_file_path)
+
+    # Extract index from filename
+    index = int(xml_file.split("_")[0])
+
+    # Corresponding image filename
+    jpg_file = xml_file.replace(".xml", ".jpg")
+
+    # Initialize a dictionary to store the metadata for the current file
+    file_metadata = {"index": index, "filename": jpg_file}
+
+    # State of the parse: depth of the current element, depth of the first
+    # metadata section (None until it is found) and the field being read
+    state = {"depth": 0, "dc_depth": None, "done": False, "tag": None, "text": None}
+
+    def start_element(name, attrs):
+        state["depth"] += 1
+        if state["done"]:
+            return
+        if state["dc_depth"] is None:
+            if name == DC_ELEMENT:
+                state["dc_depth"] = state["depth"]
+        elif state["depth"] == state["dc_depth"] + 1:
+            state["tag"] = name.split(":")[-1]  # Strip namespace prefix
+            state["text"] = None
+        elif state["tag"] is not None:
+            # Only the text before the first child element is kept
+            add_field(state["tag"], state["text"])
+            state["tag"] = None
+
+    def end_element(name):
+        if state["tag"] is not None and state["depth"] == state["dc_depth"] + 1:
+            add_field(state["tag"], state["text"])
+            state["tag"] = None
+        elif state["depth"] == state["dc_depth"]:
+            state["done"] = True
+        state["depth"] -= 1
+
+    def character_data(data):
+        if state["tag"] is not None:
+            state["text"] = data if state["text"] is None else state["text"] + data
+
+    def add_field(tag, text):
+        if tag in file_metadata:
+            # If tag already exists, convert to list and append the new value
+            if isinstance(file_metadata[tag], list):
+                file_metadata[tag].append(text)
+            else:
+                file_metadata[tag] = [file_metadata[tag], text]
+        else:
+            file_metadata[tag] = text
+
+    parser = expat.ParserCreate()
+    parser.buffer_text = True
+    parser.StartElementHandler = start_element
+    parser.EndElementHandler = end_element
+    parser.CharacterDataHandler = character_data
+
+    with open(xml_file_path, "rb") as file:
+        parser.ParseFile(file)
+        bytes_read = file.tell()
+
+    return file_metadata, bytes_read
+
+
+def parse_chunk(xml_file_paths):
+    """Parse a batch of record files in a worker process.
+
+    Returns the records and the number of bytes read.
+    """
+    records = []
+    bytes_read = 0
+    for xml_file_path in xml_file_paths:
+        file_metadata, file_bytes = parse_record(xml_file_path)
+        records.append(file_metadata)
+        bytes_read += file_bytes
+    return records, bytes_read
 
-        # Read as text
-        with open(xml_file_path, "r") as file:
-            xml_text = file.read()
 
-        # Extract index from filename
-        index = int(xml_file.split("_")[0])
+def main(xml_path, csv_path=None, workers=None, chunk_size=256, profile=False):
 
-        # Corresponding image filename
-        jpg_file = xml_file.replace(".xml", ".jpg")
+    if csv_path is None:
+        output_dir = os.path.join(os.path.dirname(os.path.dirname(xml_path)), "output")
+        if not os.path.exists(output_dir):
+            os.makedirs(output_dir)
+        csv_path = os.path.join(output_dir, "rijksmuseum_metadata_final.csv")
 
-        # Add namespaces to the XML text
-        xml_text = xml_text.replace(
-            "<record>",
-            "<record "
-            'xmlns:oai_dc="http://www.openarchives.org/OAI/2.0/oai_dc/" '
-            'xmlns:dc="http://purl.org/dc/elements/1.1/">',
-        )
+    with RunReport("Rijksmuseum/convert_metadata_to_csv", csv_path, profile) as report:
+        with report.phase("scan") as phase:
+            xml_files = [file for file in os.listdir(xml_path) if file.endswith(".xml")]
+            phase.records = len(xml_files)
 
-        # Parse the XML text
-        root = ET.fromstring(xml_text)
-
-        # Find the 'metadata' section using XPath and namespaces
-        metadata = root.find(".//oai_dc:dc", namespaces=namespaces)
-
-        # Initialize a dictionary to store the metadata for the current file
-        file_metadata = {"index": index, "filename": jpg_file}
-
-        # Extract and store the desired information
-        if metadata is not None:
-            for element in metadata:
-                tag = element.tag.split("}")[1]  # Strip namespace
-                text = element.text
-
-                if tag in file_metadata:
-                    # If tag already exists, convert to list and append the new value
-                    if isinstance(file_metadata[tag], list):
-                        file_metadata[tag].append(text)
-                    else:
-                        file_metadata[tag] = [file_metadata[tag], text]
-                else:
-                    file_metadata[tag] = text
-
-        # Append the file metadata to the DataFrame
-        rijksmuseum_df = pd.concat(
-            [rijksmuseum_df, pd.DataFrame([file_metadata])], ignore_index=True
+        print(
+            f"Found {len(xml_files)} XML files in the directory! Extracting metadata..."
         )
 
-    # Serialize lists as JSON strings
-    for column in rijksmuseum_df.columns:
-        rijksmuseum_df[column] = rijksmuseum_df[column].apply(
-            lambda x: json.dumps(x) if isinstance(x, list) else x
+        start_time = time.perf_counter()
+
+        # Split the files into chunks that are parsed by the worker processes
+        xml_file_paths = [os.path.join(xml_path, xml_file) for xml_file in xml_files]
+        chunks = [
+            xml_file_paths[i : i + chunk_size]
+            for i in range(0, len(xml_file_paths), chunk_size)
+        ]
+
+        records = []
+
+        with report.phase("parse", hot=True) as phase, executor(
+            ProcessPoolExecutor, profile, max_workers=workers
+        ) as pool:
+            with tqdm(total=len(xml_files), desc="Processing XML files") as bar:
+                # Chunks are consumed in submission order to keep the file order
+                for chunk_records, bytes_read in pool.map(parse_chunk, chunks):
+                    records.extend(chunk_records)
+                    bar.update(len(chunk_records))
+                    phase.bytes_read += bytes_read
+            phase.records = len(records)
+
+        with report.phase("write") as phase:
+            # Build the DataFrame in one step
+            rijksmuseum_df = pd.DataFrame(records)
+
+            # Serialize lists as JSON strings
+            for column in rijksmuseum_df.columns:
+                rijksmuseum_df[column] = rijksmuseum_df[column].apply(
+                    lambda x: json.dumps(x) if isinstance(x, list) else x
+                )
+
+            # Set the 'index' column as the DataFrame index
+            rijksmuseum_df.set_index("index", inplace=True)
+
+            # Save the DataFrame to a CSV file
+            rijksmuseum_df.to_csv(csv_path)
+            phase.records = len(rijksmuseum_df)
+            phase.wrote(csv_path)
+
+        elapsed = time.perf_counter() - start_time
+        print(
+            f"Converted {len(records)} records in {elapsed:.1f}s "
+            f"({len(records) / elapsed if elapsed else 0:.0f} records/s)"
         )
 
-    # Set the 'index' column as the DataFrame index
-    rijksmuseum_df.set_index("index", inplace=True)
-
-    # Save the DataFrame to a CSV file
-    rijksmuseum_df.to_csv(csv_path)
-
     """
     For reading the CSV file, we need to deserialize the JSON strings back to lists:
         # Reading the CSV file and deserializing JSON strings back to lists
@@ -117,7 +191,25 @@ if __name__ == "__main__":
     parser.add_argument(
         "--csv_path", type=str, help="Path to save the resulting CSV file", default=None
     )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="Number of worker processes (defaults to the number of CPUs).",
+    )
+    parser.add_argument(
+        "--chunk_size",
+        type=int,
+        default=256,
+        help="Number of XML files parsed per task.",
+    )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="Profile the parsing, in a single process, to Datasets/reports "
+        "(parse.prof).",
+    )
 
     args = parser.parse_args()
 
-    main(args.xml_path, args.csv_path)
+    main(args.xml_path, args.csv_path, args.workers, args.chunk_size, args.profile)
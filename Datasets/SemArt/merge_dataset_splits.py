@@ -1,36 +1,47 @@
 import argparse
 import os.path
+from concurrent.futures import ThreadPoolExecutor
 
 import pandas as pd
 
+from Datasets.instrumentation import RunReport, executor
+from Datasets.readers import READ_OPTIONS, read_csv
 
-def merge_splits(root, out_path):
+
+def merge_splits(root, out_path, profile=False):
 
     train_path = os.path.join(root, "semart_train.csv")
     test_path = os.path.join(root, "semart_test.csv")
     val_path = os.path.join(root, "semart_val.csv")
 
-    # Load the data from CSV files
-    train_df = pd.read_csv(train_path, encoding="latin-1", sep="	")
-    print(f"Number of rows in train split: {len(train_df)}")
-
-    test_df = pd.read_csv(test_path, encoding="latin-1", sep="	")
-    print(f"Number of rows in test split: {len(test_df)}")
-
-    val_df = pd.read_csv(val_path, encoding="latin-1", sep="	")
-    print(f"Number of rows in val split: {len(val_df)}")
-
-    # Add a 'SPLIT' column to each dataframe
-    train_df["SPLIT"] = "train"
-    test_df["SPLIT"] = "test"
-    val_df["SPLIT"] = "val"
-
-    # Merge the dataframes
-    merged_df = pd.concat([train_df, test_df, val_df], ignore_index=True)
-    print(f"Number of rows in merged dataframe: {len(merged_df)}")
-
-    # Save the merged dataframe to a new CSV file
-    merged_df.to_csv(out_path, index=False)
+    with RunReport("SemArt/merge_dataset_splits", out_path, profile) as report:
+        # Load the data from CSV files, reading the three splits concurrently
+        with report.phase("read", hot=True) as phase:
+            with executor(ThreadPoolExecutor, profile, max_workers=3) as pool:
+                train_df, test_df, val_df = pool.map(
+                    lambda path: read_csv(path, **READ_OPTIONS["SemArt split"]),
+                    [train_path, test_path, val_path],
+                )
+            phase.records = len(train_df) + len(test_df) + len(val_df)
+            phase.read(train_path, test_path, val_path)
+        print(f"Number of rows in train split: {len(train_df)}")
+        print(f"Number of rows in test split: {len(test_df)}")
+        print(f"Number of rows in val split: {len(val_df)}")
+
+        with report.phase("write") as phase:
+            # Add a 'SPLIT' column to each dataframe
+            train_df["SPLIT"] = "train"
+            test_df["SPLIT"] = "test"
+            val_df["SPLIT"] = "val"
+
+            # Merge the dataframes
+            merged_df = pd.concat([train_df, test_df, val_df], ignore_index=True)
+            print(f"Number of rows in merged dataframe: {len(merged_df)}")
+
+            # Save the merged dataframe to a new CSV file
+            merged_df.to_csv(out_path, index=False)
+            phase.records = len(merged_df)
+            phase.wrote(out_path)
 
 
 if __name__ == "__main__":
@@ -52,6 +63,12 @@ if __name__ == "__main__":
         help="Path to the output directory where the CSV file will be saved.",
     )
 
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="Profile the reading of the splits to Datasets/reports (read.prof).",
+    )
+
     args = parser.parse_args()
 
     if not args.output_dir:
@@ -60,4 +77,4 @@ if __name__ == "__main__":
             os.makedirs(output_dir)
         args.output_dir = os.path.join(output_dir, "semart_merged.csv")
 
-    merge_splits(root=args.root, out_path=args.output_dir)
+    merge_splits(root=args.root, out_path=args.output_dir, profile=args.profile)
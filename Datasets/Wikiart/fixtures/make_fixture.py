@@ -0,0 +1,50 @@
+import os
+import random
+
+import datasets
+
+# Minimal PNG header followed by random bytes: the export must never decode it
+FAKE_PNG = b"\x89PNG\r\n\x1a\n"
+
+FEATURES = datasets.Features(
+    {
+        "image": datasets.Image(),
+        "title": datasets.Value("string"),
+        "artist": datasets.Value("string"),
+        "date": datasets.Value("string"),
+        "genre": datasets.Value("string"),
+        "style": datasets.Value("string"),
+        "description": datasets.Value("string"),
+        "filename": datasets.Value("string"),
+        "embeddings_pca512": datasets.Sequence(datasets.Value("float32")),
+    }
+)
+
+
+def make_fixture(output_dir, rows=25, seed=0):
+    """Write a small dataset with the columns of Artificio/WikiArt."""
+    rng = random.Random(seed)
+    artists = ["Berthe Morisot", "Mary Cassatt", "Judith Leyster", None]
+    data = {
+        "image": [
+            {"bytes": FAKE_PNG + rng.randbytes(64), "path": None} for _ in range(rows)
+        ],
+        "title": [f"Untitled {i}, with a comma" for i in range(rows)],
+        "artist": [rng.choice(artists) for _ in range(rows)],
+        "date": [rng.choice(["1887", "c. 1650", None]) for _ in range(rows)],
+        "genre": [rng.choice(["portrait", "landscape"]) for _ in range(rows)],
+        "style": [rng.choice(["Impressionism", "Baroque"]) for _ in range(rows)],
+        "description": [f'A "quoted"\ndescription {i}' for i in range(rows)],
+        "filename": [f"{i:05d}.jpg" for i in range(rows)],
+        "embeddings_pca512": [[rng.random() for _ in range(8)] for _ in range(rows)],
+    }
+    os.makedirs(output_dir, exist_ok=True)
+    # Cast the raw image bytes instead of encoding them, which needs Pillow
+    dataset = datasets.Dataset.from_dict(data).cast(FEATURES)
+    dataset.to_parquet(os.path.join(output_dir, "train.parquet"))
+
+
+if __name__ == "__main__":
+    make_fixture(
+        os.path.join(os.path.dirname(os.path.abspath(__file__)), "wikiart_sample")
+    )
@@ -1,11 +1,32 @@
 import argparse
 
-import pandas as pd
 import datasets
 import os
+import time
 
+try:
+    import pyarrow.parquet as pq
+except ImportError:  # Only needed for the optional Parquet output
+    pq = None
 
-def get_wikiart_metadata(output_path):
+from Datasets.instrumentation import RunReport
+
+# Columns of the dataset that are not metadata
+EXCLUDED_COLUMNS = ["image", "embeddings_pca512"]
+
+
+def get_wikiart_metadata(
+    output_path, dataset="Artificio/WikiArt", batch_size=1000, profile=False
+):
+    """Export the metadata of the WikiArt dataset to a CSV or Parquet file.
+
+    The dataset is streamed as Arrow batches holding only the metadata
+    columns, so images and embeddings are never decoded nor written to disk,
+    and no temporary CSV is needed. Batches are appended to the output as
+    they arrive; the format is chosen from the extension of `output_path`.
+    `dataset` can be the name of a dataset on the Hugging Face Hub or a local
+    directory, e.g. a fixture. Returns the number of rows written.
+    """
 
     if not output_path:
         # Get the absolute path of the current file
@@ -20,28 +41,56 @@ def get_wikiart_metadata(output_path):
 
         output_path = os.path.join(output_dir, "wikiart_metadata.csv")
 
-    # Get dataset from hugging face
-    wikiart = datasets.load_dataset("Artificio/WikiArt")
-
-    # Export to csv
-    wikiart["train"].to_csv("tmp_wikiart.csv")
-
-    # import csv
-    wikiart_df = pd.read_csv("tmp_wikiart.csv")
-
-    # Remove "image" and "embeddings_pca512" columns
-    wikiart_df = wikiart_df.drop(columns=["image", "embeddings_pca512"])
-
-    # Save the dataframe to a new csv file
-    print("Saving the metadata to a new CSV file...")
-    wikiart_df.to_csv(output_path, index=False)
-
-    # Remove the tmp file
-    os.remove("tmp_wikiart.csv")
-
-    print("Done!")
-
-    return wikiart_df
+    parquet = output_path.endswith(".parquet")
+    if parquet and pq is None:
+        raise ImportError("pyarrow is required to write the Parquet output")
+
+    with RunReport("Wikiart/get_wikiart_metadata", output_path, profile) as report:
+        # Stream the dataset from hugging face. Only the metadata columns are read
+        # from its Parquet files, so the image bytes are never loaded nor decoded
+        with report.phase("open"):
+            wikiart = datasets.load_dataset(dataset, split="train", streaming=True)
+            columns = [
+                column
+                for column in wikiart.column_names
+                if column not in EXCLUDED_COLUMNS
+            ]
+            wikiart = datasets.load_dataset(
+                dataset, split="train", streaming=True, columns=columns
+            ).with_format("arrow")
+
+        print("Saving the metadata...")
+        start = time.perf_counter()
+        rows = 0
+        writer = None
+        with report.phase("export", hot=True) as phase:
+            with open(
+                output_path,
+                "wb" if parquet else "w",
+                encoding=None if parquet else "utf-8",
+            ) as f:
+                for table in wikiart.iter(batch_size=batch_size):
+                    table = table.select(columns)
+                    if parquet:
+                        if writer is None:
+                            writer = pq.ParquetWriter(f, table.schema)
+                        writer.write_table(table)
+                    else:
+                        table.to_pandas().to_csv(f, header=rows == 0, index=False)
+                    rows += table.num_rows
+                if writer is not None:
+                    writer.close()
+            phase.records = rows
+            phase.wrote(output_path)
+
+        elapsed = time.perf_counter() - start
+        print(
+            f"Saved {rows} rows to '{output_path}' in {elapsed:.1f}s "
+            f"({rows / elapsed if elapsed else 0:.0f} rows/s)"
+        )
+        print("Done!")
+
+    return rows
 
 
 if __name__ == "__main__":
@@ -54,6 +103,24 @@ if __name__ == "__main__":
         default=None,
         help="Path to the output directory where the CSV file will be saved.",
     )
+    parser.add_argument(
+        "--dataset",
+        type=str,
+        default="Artificio/WikiArt",
+        help="Hugging Face dataset name or local dataset directory (e.g. fixtures).",
+    )
+    parser.add_argument(
+        "--batch_size",
+        type=int,
+        default=1000,
+        help="Number of rows written at a time.",
+    )
+
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="Profile the export to Datasets/reports (export.prof).",
+    )
 
     args = parser.parse_args()
-    get_wikiart_metadata(args.output_dir)
+    get_wikiart_metadata(args.output_dir, args.dataset, args.batch_size, args.profile)
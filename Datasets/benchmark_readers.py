@@ -0,0 +1,92 @@
+import argparse
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+from pandas.testing import assert_frame_equal
+
+from Datasets.readers import READ_OPTIONS, read_csv
+from Datasets.unify_datasets import DATASETS_DIR, SOURCES
+
+SEMART_SPLITS = ["semart_train.csv", "semart_test.csv", "semart_val.csv"]
+
+
+def timed(function, *args, **kwargs):
+    start = time.perf_counter()
+    result = function(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def memory(df):
+    return df.memory_usage(deep=True).sum() / 1024**2
+
+
+def benchmark_source(source, root_dir):
+    """Compare the default pandas reader with the shared reader on one source."""
+    path = os.path.join(root_dir, source["csv"])
+    # What unify_datasets.py used to do: default parser and dtypes, then drop
+    options = {"index_col": 0} if source["name"] == "Ukiyo-e" else {}
+    baseline, baseline_time = timed(pd.read_csv, path, **options)
+    baseline = baseline.drop(columns=source["drop"])
+
+    df, elapsed = timed(read_csv, path, exclude=source["drop"], **source["read_csv"])
+    assert_frame_equal(baseline, df, check_exact=True)
+
+    print(
+        f"{source['name']:>12}: {baseline_time:6.2f}s -> {elapsed:6.2f}s "
+        f"({baseline_time / elapsed:.1f}x), "
+        f"{memory(baseline):7.1f} MB -> {memory(df):7.1f} MB"
+    )
+
+
+def benchmark_semart(semart_dir):
+    """Compare reading the SemArt splits one after the other and concurrently."""
+    paths = [os.path.join(semart_dir, split) for split in SEMART_SPLITS]
+
+    def sequential():
+        return [pd.read_csv(path, encoding="latin-1", sep="\t") for path in paths]
+
+    def concurrent():
+        with ThreadPoolExecutor(max_workers=len(paths)) as executor:
+            return list(
+                executor.map(
+                    lambda path: read_csv(path, **READ_OPTIONS["SemArt split"]),
+                    paths,
+                )
+            )
+
+    baseline, baseline_time = timed(sequential)
+    splits, elapsed = timed(concurrent)
+    for expected, df in zip(baseline, splits):
+        assert_frame_equal(expected, df, check_exact=True)
+    print(
+        f"{'SemArt splits':>12}: {baseline_time:6.2f}s -> {elapsed:6.2f}s "
+        f"({baseline_time / elapsed:.1f}x)"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Compare the shared CSV readers with the default pandas reader."
+    )
+    parser.add_argument(
+        "--root_dir",
+        type=str,
+        default=DATASETS_DIR,
+        help="Root directory of the source CSVs, as for unify_datasets.py.",
+    )
+    parser.add_argument(
+        "--semart_dir",
+        type=str,
+        default=None,
+        help="Directory containing the original SemArt splits.",
+    )
+    args = parser.parse_args()
+
+    print("Load time and DataFrame memory, default pandas reader -> shared reader")
+    for source in SOURCES:
+        if os.path.exists(os.path.join(args.root_dir, source["csv"])):
+            benchmark_source(source, args.root_dir)
+    if args.semart_dir:
+        benchmark_semart(args.semart_dir)
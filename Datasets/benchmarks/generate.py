@@ -0,0 +1,383 @@
+import os
+import json
+import random
+import shutil
+import argparse
+import pandas as pd
+from xml.sax.saxutils import escape
+
+from Datasets.Met.response_cache import ResponseCache
+
+# Artists written the many ways the sources write them
+ARTISTS = [
+    "Mary Cassatt",
+    "Cassatt, Mary",
+    "Judith Leyster",
+    "LEYSTER, Judith",
+    "Berthe Morisot",
+    "Élisabeth Louise Vigée Le Brun",
+    "Artemisia Gentileschi",
+    "Rembrandt van Rijn",
+    "Katsushika Hokusai",
+    "Rachel Ruysch",
+    "Sofonisba Anguissola",
+    "Unknown: Anonymous (Dutch)",
+    "['Artist: Utagawa Hiroshige', 'Publisher: Uoya Eikichi']",
+    "['Rembrandt van Rijn', 'Ferdinand Bol']",
+]
+DATES = [
+    "1887",
+    "ca. 1650–60",
+    "19th century",
+    "1880s",
+    "c. 1900",
+    "1635",
+    "1900-1905",
+    "late 18th century",
+    "Edo period (1615–1868)",
+    "n.d.",
+    "1887-05-12",
+    "1889-06",
+]
+WORDS = (
+    "portrait of a woman young mother sewing landscape with river still life "
+    "flowers in a vase the artist's daughter seated interior café œuvre naïve "
+    "señora study of hands allegory of painting harbour at dusk"
+).split()
+TYPES = ["painting", "drawing", "print", "portrait", "landscape", "still life"]
+TECHNIQUES = ["Oil on canvas", "Watercolor on paper", "Woodblock print", "Etching"]
+
+
+def text(rng, min_words, max_words):
+    return " ".join(rng.choices(WORDS, k=rng.randint(min_words, max_words)))
+
+
+def maybe(rng, value, missing=0.1):
+    return None if rng.random() < missing else value
+
+
+def generate_gac(root, records, seed=0):
+    """GAC tree: <outer>/<Artist_Name>/works/<artwork>/metadata.json."""
+    rng = random.Random(seed)
+    for i in range(records):
+        # About 20 artworks per artist, in 10 outer directories
+        artist = i // 20
+        artist_dir = os.path.join(root, f"outer{artist % 10}", f"Artist_{artist}")
+        work_dir = os.path.join(artist_dir, "works", f"artwork_{i}")
+        os.makedirs(work_dir, exist_ok=True)
+        metadata = {
+            "id": f"gac-{i}",
+            "title": text(rng, 1, 6),
+            "creator": rng.choice(ARTISTS),
+            "type": rng.choice(TYPES),
+            "main text": text(rng, 20, 120),
+            "medium": rng.choice(TECHNIQUES),
+        }
+        # Either date or date created is set, as in the real metadata
+        metadata["date" if rng.random() < 0.5 else "date created"] = rng.choice(DATES)
+        if rng.random() < 0.3:
+            metadata["tags"] = rng.sample(WORDS, 3)
+        with open(os.path.join(work_dir, "metadata.json"), "w") as f:
+            json.dump(metadata, f)
+
+
+def generate_rijksmuseum(xml_dir, records, seed=0):
+    """One OAI-DC record file per artwork: <index>_<object number>.xml."""
+    rng = random.Random(seed)
+    os.makedirs(xml_dir, exist_ok=True)
+    for i in range(records):
+        fields = {
+            "title": [text(rng, 1, 6)],
+            "creator": [rng.choice(ARTISTS)],
+            "date": [rng.choice(DATES)],
+            "type": rng.sample(TYPES, rng.randint(1, 2)),
+            "description": [text(rng, 10, 80)],
+            "subject": rng.sample(WORDS, rng.randint(0, 3)),
+            "format": [rng.choice(TECHNIQUES)],
+            "identifier": [f"SK-A-{i}"],
+        }
+        elements = "".join(
+            f"<dc:{tag}>{escape(value)}</dc:{tag}>"
+            for tag, values in fields.items()
+            for value in values
+        )
+        record = (
+            '<?xml version="1.0" encoding="UTF-8"?>\n'
+            "<record><header><identifier>oai:rijksmuseum.nl:SK-A-"
+            f"{i}</identifier></header><metadata><oai_dc:dc>{elements}"
+            "</oai_dc:dc></metadata></record>"
+        )
+        with open(os.path.join(xml_dir, f"{i}_SK-A-{i}.xml"), "w") as f:
+            f.write(record)
+
+
+def met_page(rng, met_id):
+    """Object page with the structure of the saved Met pages."""
+    title = escape(text(rng, 1, 6))
+    items = {
+        "Title": title,
+        "Artist": escape(rng.choice(ARTISTS)),
+        "Date": escape(rng.choice(DATES)),
+        "Medium": rng.choice(TECHNIQUES),
+        "Dimensions": f"{rng.randint(5, 90)} x {rng.randint(5, 90)} in.",
+        "Classifications": rng.choice(TYPES).title(),
+        "Credit Line": f"Bequest of {text(rng, 2, 4)}, 19{rng.randint(10, 99)}",
+        "Object Number": f"{rng.randint(10, 99)}.{rng.randint(1, 300)}.{met_id}",
+    }
+    tombstone = "".join(
+        '<p class="artwork-tombstone--item">'
+        f'<span class="artwork-tombstone--label">{label}:</span>'
+        f'<span class="artwork-tombstone--value">{value}</span></p>\n'
+        for label, value in items.items()
+        if label == "Title" or rng.random() > 0.1
+    )
+    related = "".join(
+        f'<div class="related-card"><a href="/art/collection/search/{i}">'
+        f'<img src="/images/{i}.jpg" alt="Related object {i}"/></a>'
+        f'<p class="related-card__title">Related object {i} &mdash; <em>Study</em>'
+        f'</p><script>track({{"id": {i}}});</script></div>\n'
+        for i in range(met_id, met_id + rng.randint(5, 40))
+    )
+    keywords = ", ".join(rng.sample(WORDS, 4))
+    return (
+        '<!DOCTYPE html>\n<html lang="en">\n<head>\n<meta charset="utf-8">\n'
+        f"<title>{title} | The Metropolitan Museum of Art</title>\n"
+        f'<meta name="keywords" content="{keywords}">\n</head>\n'
+        '<body class="collection-object">\n<main id="main">\n'
+        '<section class="artwork__intro">\n'
+        f'<h1 class="artwork__title--text">{title}</h1>\n'
+        '<div class="artwork__intro__desc js-artwork__intro__desc">'
+        f"<p>{escape(text(rng, 20, 120))}</p></div>\n</section>\n"
+        '<section class="artwork__tombstone"><div class="show-more__body '
+        'js-show-more__body"><div class="artwork-tombstone">\n'
+        f"{tombstone}</div></div></section>\n"
+        f'<section class="related">\n{related}</section>\n</main>\n</body>\n</html>\n'
+    )
+
+
+def generate_met(met_dir, records, seed=0):
+    """Met object pages in a response cache, and the database listing them.
+
+    The extraction can then run offline on the cached pages.
+    """
+    rng = random.Random(seed)
+    cache = ResponseCache(os.path.join(met_dir, "cache"))
+    met_ids = list(range(1000, 1000 + records))
+    for met_id in met_ids:
+        cache.put(met_id, met_page(rng, met_id))
+    cache.close()
+    with open(os.path.join(met_dir, "database.json"), "w") as f:
+        json.dump([{"id": met_id} for met_id in met_ids], f)
+
+
+def generate_semart(semart_dir, records, seed=0):
+    """The three latin-1 TSV splits of SemArt, 80/10/10."""
+    rng = random.Random(seed)
+    os.makedirs(semart_dir, exist_ok=True)
+    splits = {"train": records * 8 // 10, "test": records // 10}
+    splits["val"] = records - splits["train"] - splits["test"]
+    for split, rows in splits.items():
+        df = pd.DataFrame(
+            {
+                "IMAGE_FILE": [f"{i}-{split}.jpg" for i in range(rows)],
+                "DESCRIPTION": [text(rng, 20, 150) for _ in range(rows)],
+                "AUTHOR": [rng.choice(ARTISTS) for _ in range(rows)],
+                "TITLE": [text(rng, 1, 6) for _ in range(rows)],
+                "TECHNIQUE": [
+                    f"{rng.choice(TECHNIQUES)}, {rng.randint(10, 99)} x "
+                    f"{rng.randint(10, 99)} cm"
+                    for _ in range(rows)
+                ],
+                "DATE": [rng.choice(DATES) for _ in range(rows)],
+                "TYPE": [rng.choice(TYPES) for _ in range(rows)],
+                "SCHOOL": [
+                    rng.choice(["Dutch", "French", "Italian"]) for _ in range(rows)
+                ],
+                "TIMEFRAME": [
+                    rng.choice(["1601-1650", "1851-1900"]) for _ in range(rows)
+                ],
+            }
+        )
+        df.to_csv(
+            os.path.join(semart_dir, f"semart_{split}.csv"),
+            sep="\t",
+            encoding="latin-1",
+            errors="replace",
+            index=False,
+        )
+
+
+def generate_unify_csvs(root_dir, records, seed=0):
+    """The metadata CSVs of the six sources, where unify_datasets.py reads them."""
+    rng = random.Random(seed)
+
+    def column(values, missing=0.1):
+        return [maybe(rng, rng.choice(values), missing) for _ in range(records)]
+
+    def texts(min_words, max_words, missing=0.1):
+        return [
+            maybe(rng, text(rng, min_words, max_words), missing) for _ in range(records)
+        ]
+
+    def save(df, path, **kwargs):
+        path = os.path.join(root_dir, path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        df.to_csv(path, **kwargs)
+
+    ids = range(records)
+    save(
+        pd.DataFrame(
+            {
+                "met_id": ids,
+                "description": texts(20, 120),
+                "title": texts(1, 6, 0),
+                "artist": column(ARTISTS),
+                "date": column(DATES),
+                "medium": column(TECHNIQUES),
+                "classification": column(TYPES),
+                "keywords": texts(3, 6),
+            }
+        ),
+        "Met/output/met_metadata_final.csv",
+        index=False,
+    )
+    save(
+        pd.DataFrame(
+            {
+                "IMAGE_FILE": [f"{i}.jpg" for i in ids],
+                "DESCRIPTION": texts(20, 150, 0),
+                "AUTHOR": column(ARTISTS, 0),
+                "TITLE": texts(1, 6, 0),
+                "TECHNIQUE": column(TECHNIQUES, 0),
+                "DATE": column(DATES),
+                "TYPE": column(TYPES, 0),
+                "SCHOOL": column(["Dutch", "French", "Italian"], 0),
+                "TIMEFRAME": column(["1601-1650", "1851-1900"], 0),
+                "SPLIT": column(["train", "test", "val"], 0),
+            }
+        ),
+        "SemArt/output/semart_metadata_final.csv",
+        index=False,
+    )
+    save(
+        pd.DataFrame(
+            {
+                "index": ids,
+                "filename": [f"{i}_SK-A-{i}.jpg" for i in ids],
+                "title": texts(1, 6),
+                "creator": column(ARTISTS),
+                "date": column(DATES),
+                "type": column(TYPES),
+                "description": texts(10, 80),
+                "subject": column(WORDS, 0.5),
+            }
+        ),
+        "Rijksmuseum/output/rijksmuseum_metadata_final.csv",
+        index=False,
+    )
+    ukiyoe = pd.DataFrame(
+        {
+            "image_file": [f"ukiyoe_{i}.jpg" for i in ids],
+            "description": texts(5, 40, 0.3),
+            "artistString": column(ARTISTS),
+            "title": texts(1, 6),
+            "date": column(DATES),
+            "type": column(TYPES),
+            "height": [rng.uniform(10, 80) for _ in ids],
+            "width": [rng.uniform(10, 80) for _ in ids],
+            "Unnamed: 42": None,
+        }
+    )
+    save(ukiyoe, "Ukiyo-e/output/ukiyoe_metadata_final.csv")
+    save(
+        pd.DataFrame(
+            {
+                "filename": [f"wikiart_{i}.jpg" for i in ids],
+                "artist": column(ARTISTS),
+                "title": texts(1, 6),
+                "date": column(DATES),
+                "genre": column(TYPES),
+                "style": column(["Impressionism", "Baroque", "Ukiyo-e"]),
+                "description": texts(5, 60, 0.5),
+            }
+        ),
+        "Wikiart/output/wikiart_metadata_final.csv",
+        index=False,
+    )
+    save(
+        pd.DataFrame(
+            {
+                "id": [f"gac-{i}" for i in ids],
+                "title": texts(1, 6),
+                "creator": column(ARTISTS),
+                "date": column(DATES),
+                "type": column(TYPES),
+                "main_text": texts(20, 120),
+                "artwork_path": [
+                    f"outer{i % 10}/Artist_{i // 20}/artwork_{i}" for i in ids
+                ],
+                "medium": column(TECHNIQUES),
+            }
+        ),
+        "GAC/output/gac_metadata_final.csv",
+        index=False,
+    )
+
+
+# Generators of the inputs of every source, writing to <work_dir>/<name>
+GENERATORS = {
+    "gac": generate_gac,
+    "rijksmuseum": generate_rijksmuseum,
+    "met": generate_met,
+    "semart": generate_semart,
+    "unify": generate_unify_csvs,
+}
+
+
+def generate(work_dir, records, names=GENERATORS, seed=0):
+    """Generate the inputs of the sources in `names`, unless already generated.
+
+    A `generated.json` marker records the number of records of every input,
+    so inputs at another scale are generated again.
+    """
+    marker_path = os.path.join(work_dir, "generated.json")
+    try:
+        with open(marker_path, "r") as f:
+            marker = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        marker = {}
+
+    for name in names:
+        if marker.get(name) == [records, seed]:
+            continue
+        path = os.path.join(work_dir, name)
+        if os.path.exists(path):
+            shutil.rmtree(path)
+        print(f"Generating {records} {name} records...")
+        GENERATORS[name](path, records, seed)
+        marker[name] = [records, seed]
+        with open(marker_path, "w") as f:
+            json.dump(marker, f)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Generate synthetic inputs for the benchmarks."
+    )
+    parser.add_argument(
+        "--work_dir", type=str, required=True, help="Directory of the inputs."
+    )
+    parser.add_argument(
+        "--records", type=int, default=10000, help="Number of records per source."
+    )
+    parser.add_argument(
+        "--sources",
+        nargs="*",
+        default=list(GENERATORS),
+        choices=list(GENERATORS),
+        help="Sources to generate.",
+    )
+    parser.add_argument("--seed", type=int, default=0, help="Random seed.")
+    args = parser.parse_args()
+
+    generate(args.work_dir, args.records, args.sources, args.seed)
@@ -0,0 +1,283 @@
+import os
+import sys
+import json
+import time
+import platform
+import argparse
+import tempfile
+import importlib
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from multiprocessing import get_context
+
+from Datasets import instrumentation
+from Datasets.benchmarks.generate import generate
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+
+def load_script(name):
+    """Import a script of the repository, from its module name in Datasets."""
+    return importlib.import_module(f"Datasets.{name}")
+
+
+# Every stage runs on the generated inputs in `work_dir` and writes to `output_dir`
+def run_gac(work_dir, output_dir, records, workers):
+    script = load_script("GAC.convert_metadata_to_csv")
+    script.main(
+        os.path.join(work_dir, "gac"), os.path.join(output_dir, "gac.csv"), workers
+    )
+    return records
+
+
+def run_rijksmuseum(work_dir, output_dir, records, workers):
+    script = load_script("Rijksmuseum.convert_metadata_to_csv")
+    script.main(
+        os.path.join(work_dir, "rijksmuseum"),
+        os.path.join(output_dir, "rijksmuseum.csv"),
+        workers,
+    )
+    return records
+
+
+def run_met(work_dir, output_dir, records, workers):
+    # get_props on the cached pages, with the journals and merge of a crawl
+    script = load_script("Met.extract_metadata_concurrent")
+    cache_module = load_script("Met.response_cache")
+    script.fetch_dataset(
+        os.path.join(work_dir, "met", "database.json"),
+        os.path.join(output_dir, "met", "met_metadata.csv"),
+        max_workers=workers or 4,
+        cache=cache_module.ResponseCache(os.path.join(work_dir, "met", "cache")),
+        offline=True,
+    )
+    return records
+
+
+def run_semart(work_dir, output_dir, records, workers):
+    script = load_script("SemArt.merge_dataset_splits")
+    script.merge_splits(
+        os.path.join(work_dir, "semart"), os.path.join(output_dir, "semart.csv")
+    )
+    return records
+
+
+def run_unify(work_dir, output_dir, records, workers):
+    # A full rebuild: read, clean, parse the dates and write_dataframe_to_xml
+    script = load_script("unify_datasets")
+    script.main(
+        os.path.join(work_dir, "unify"),
+        os.path.join(output_dir, "merged_datasets.xml"),
+        workers,
+        cache_dir=os.path.join(output_dir, "unify_cache"),
+        rebuild=True,
+    )
+    return records * len(script.SOURCES)
+
+
+def run_artists(work_dir, output_dir, records, workers):
+    # process_artist_name on every <artist> of the XML written by the unify stage
+    xml_file = os.path.join(output_dir, "merged_datasets.xml")
+    if not os.path.exists(xml_file):
+        raise FileNotFoundError("The artists stage needs the output of unify")
+    script = load_script("Artists.extract_unique_artists")
+    script.extract_unique_artists(xml_file, streaming=True)
+    # One artwork per record of the six unify CSVs
+    return records * 6
+
+
+# Stages, with the generated inputs they need
+STAGES = {
+    "gac": (run_gac, "gac"),
+    "rijksmuseum": (run_rijksmuseum, "rijksmuseum"),
+    "met": (run_met, "met"),
+    "semart": (run_semart, "semart"),
+    "unify": (run_unify, "unify"),
+    "artists": (run_artists, "unify"),
+}
+
+
+def measure(name, work_dir, output_dir, records, workers, verbose):
+    """Run a stage and return its duration, throughput and peak memory.
+
+    Called in a fresh process for every stage, so the peak memory of a stage
+    is not hidden by the stages before it.
+    """
+    function = STAGES[name][0]
+    os.makedirs(os.path.join(output_dir, "met"), exist_ok=True)
+    # Keep the run reports of the stages with their synthetic outputs
+    instrumentation.REPORTS_DIR = os.path.join(output_dir, "reports")
+    if not verbose:
+        # Silence the stage and its own worker processes
+        devnull = os.open(os.devnull, os.O_WRONLY)
+        os.dup2(devnull, 1)
+        os.dup2(devnull, 2)
+    start = time.perf_counter()
+    processed = function(work_dir, output_dir, records, workers)
+    elapsed = time.perf_counter() - start
+    return {
+        "records": processed,
+        "seconds": round(elapsed, 3),
+        "records_per_s": round(processed / elapsed, 1),
+        "peak_rss_mb": instrumentation.peak_rss_mb(),
+    }
+
+
+def run_benchmarks(work_dir, records, stages, workers=None, repeat=1, verbose=False):
+    """Benchmark the stages, keeping the fastest of `repeat` runs of each."""
+    output_dir = os.path.join(work_dir, "output")
+    if (
+        "artists" in stages
+        and "unify" not in stages
+        and not os.path.exists(os.path.join(output_dir, "merged_datasets.xml"))
+    ):
+        raise ValueError("The artists stage needs the unify stage in a new work_dir")
+    generate(work_dir, records, sorted({STAGES[name][1] for name in stages}))
+    results = {}
+    for name in stages:
+        runs = []
+        for _ in range(repeat):
+            # Spawned, not forked, so that the process starts from a clean slate
+            with ProcessPoolExecutor(1, mp_context=get_context("spawn")) as executor:
+                runs.append(
+                    executor.submit(
+                        measure, name, work_dir, output_dir, records, workers, verbose
+                    ).result()
+                )
+        results[name] = min(runs, key=lambda run: run["seconds"])
+        print(
+            f"{name:>12}: {results[name]['seconds']:7.2f}s "
+            f"{results[name]['records_per_s']:10.0f} records/s "
+            f"{results[name]['peak_rss_mb']:8.1f} MB peak"
+        )
+    return {
+        "date": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "records": records,
+        "workers": workers,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "stages": results,
+    }
+
+
+def compare(results, baseline, tolerance):
+    """Print the changes from a baseline and return the regressed stages.
+
+    A stage regresses when its throughput drops, or its peak memory grows, by
+    more than `tolerance` (a fraction).
+    """
+    if baseline["records"] != results["records"]:
+        print(
+            f"Warning: the baseline ran on {baseline['records']} records, "
+            f"not {results['records']}"
+        )
+    regressions = []
+    for name, result in results["stages"].items():
+        if name not in baseline["stages"]:
+            continue
+        before = baseline["stages"][name]
+        speed = result["records_per_s"] / before["records_per_s"]
+        memory = result["peak_rss_mb"] / before["peak_rss_mb"]
+        regressed = speed < 1 - tolerance or memory > 1 + tolerance
+        if regressed:
+            regressions.append(name)
+        print(
+            f"{name:>12}: throughput {speed:5.2f}x, peak memory {memory:5.2f}x"
+            + ("  REGRESSION" if regressed else "")
+        )
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Benchmark every ingestion stage on synthetic inputs."
+    )
+    parser.add_argument(
+        "--records",
+        type=int,
+        default=10000,
+        help="Number of generated records per source.",
+    )
+    parser.add_argument(
+        "--stages",
+        nargs="*",
+        default=list(STAGES),
+        choices=list(STAGES),
+        help="Stages to benchmark (artists needs unify).",
+    )
+    parser.add_argument(
+        "--work_dir",
+        type=str,
+        default=None,
+        help="Directory of the generated inputs, kept to be reused by later "
+        "runs (defaults to a temporary directory).",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="Number of workers of the stages (defaults to their own default).",
+    )
+    parser.add_argument(
+        "--repeat",
+        type=int,
+        default=1,
+        help="Number of runs of every stage, the fastest is kept.",
+    )
+    parser.add_argument(
+        "--output_file",
+        type=str,
+        default=None,
+        help="Path of the JSON results (defaults to results/<date>.json).",
+    )
+    parser.add_argument(
+        "--compare",
+        type=str,
+        default=None,
+        help="JSON results of a previous run to compare with.",
+    )
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.1,
+        help="Relative slowdown or memory growth reported as a regression.",
+    )
+    parser.add_argument(
+        "--verbose", action="store_true", help="Show the output of the stages."
+    )
+    args = parser.parse_args()
+
+    if args.work_dir:
+        results = run_benchmarks(
+            args.work_dir,
+            args.records,
+            args.stages,
+            args.workers,
+            args.repeat,
+            args.verbose,
+        )
+    else:
+        with tempfile.TemporaryDirectory() as work_dir:
+            results = run_benchmarks(
+                work_dir,
+                args.records,
+                args.stages,
+                args.workers,
+                args.repeat,
+                args.verbose,
+            )
+
+    if not args.output_file:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        date = datetime.now().strftime("%Y%m%d-%H%M%S")
+        args.output_file = os.path.join(RESULTS_DIR, f"{date}.json")
+    with open(args.output_file, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"Results saved to '{args.output_file}'")
+
+    if args.compare:
+        with open(args.compare, "r") as f:
+            baseline = json.load(f)
+        if compare(results, baseline, args.tolerance):
+            sys.exit(1)
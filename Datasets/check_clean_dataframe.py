@@ -0,0 +1,124 @@
+import io
+import re
+import argparse
+
+import numpy as np
+import pandas as pd
+from xml.sax.saxutils import escape
+
+from Datasets.unify_datasets import clean_dataframe, write_dataframe_to_xml
+
+
+def clean_text_per_cell(text):
+    """The cleaning of every value before clean_dataframe."""
+    if isinstance(text, str):
+        text = re.sub(r"[\x00-\x1F\x7F-\x9F]", "", text)
+    return text
+
+
+def per_cell_xml(df, root_name):
+    """XML of the previous path: clean every cell, then clean again at write."""
+    df = df.apply(lambda col: col.apply(clean_text_per_cell))
+    output = io.StringIO()
+    output.write(f"  <{root_name}>\n")
+    for i, row in df.iterrows():
+        output.write("    <artwork>\n")
+        for field, value in row.items():
+            output.write(
+                f"      <{field}>{escape(clean_text_per_cell(str(value)))}</{field}>\n"
+            )
+        output.write("    </artwork>\n")
+    output.write(f"  </{root_name}>\n")
+    return output.getvalue().encode("utf-8")
+
+
+def vectorized_xml(df, root_name):
+    """XML of the current path: clean_dataframe, then write_dataframe_to_xml."""
+    output = io.StringIO()
+    write_dataframe_to_xml(output, clean_dataframe(df.copy()), root_name, "artwork")
+    return output.getvalue().encode("utf-8")
+
+
+def sample_frame(rows, seed=0):
+    """Frame with control characters, missing values, markup and non-text columns."""
+    rng = np.random.default_rng(seed)
+    pieces = np.array(
+        [
+            "Portrait",
+            "of a woman",
+            "\x00",
+            "\t",
+            "\n",
+            "\r\n",
+            "\x1b[0m",
+            "\x7f",
+            "\x85",
+            "\x9f",
+            "\xa0",
+            "<i>Study</i>",
+            "Fish & Chips",
+            '"quoted"',
+            "]]>",
+            "%s %%",
+            "Vigée Le Brun",
+            "葛飾北斎",
+            "",
+        ]
+    )
+
+    def text():
+        return "".join(rng.choice(pieces, rng.integers(0, 6)))
+
+    def maybe(value):
+        return None if rng.random() < 0.2 else value
+
+    return pd.DataFrame(
+        {
+            "title": [maybe(text()) for _ in range(rows)],
+            "artist": [text() for _ in range(rows)],
+            "description": [maybe(text()) for _ in range(rows)],
+            "object_id": rng.integers(0, 10**6, rows),
+            "height": [maybe(float(value)) for value in rng.random(rows) * 100],
+            "on_view": rng.random(rows) < 0.5,
+            "mixed": [rng.choice([text(), 7, 2.5, None]) for _ in range(rows)],
+            "empty": [None] * rows,
+        }
+    )
+
+
+def check(name, df):
+    expected = per_cell_xml(df, name)
+    actual = vectorized_xml(df, name)
+    if actual != expected:
+        position = next(
+            (i for i, (a, b) in enumerate(zip(actual, expected)) if a != b),
+            min(len(actual), len(expected)),
+        )
+        raise SystemExit(
+            f"{name}: the XML differs from byte {position}: "
+            f"{expected[position - 40 : position + 40]!r} != "
+            f"{actual[position - 40 : position + 40]!r}"
+        )
+    print(f"{name}: {len(df)} rows, {len(actual)} identical bytes")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Check that clean_dataframe writes the same XML as the "
+        "per-cell cleaning it replaced."
+    )
+    parser.add_argument(
+        "--rows", type=int, default=5000, help="Number of rows of the sample frame"
+    )
+    args = parser.parse_args()
+
+    df = sample_frame(args.rows)
+    check("Constructed", df)
+
+    # The dtypes of the same values once read back from a CSV, as unify does
+    csv = io.StringIO()
+    df.to_csv(csv, index=False)
+    csv.seek(0)
+    check("ReadFromCSV", pd.read_csv(csv))
+
+    print("The per-cell and vectorized cleaning write byte-identical XML")
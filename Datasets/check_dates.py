@@ -0,0 +1,61 @@
+import pandas as pd
+
+from Datasets.dates import CENTURY, DATE_FIELDS, DECADE, YEAR, parse_dates
+
+# Dates written as in the sources, with their expected (start, end, precision)
+CASES = {
+    "1887": (1887, 1887, YEAR),
+    "1887.0": (1887, 1887, YEAR),
+    "1900-1905": (1900, 1905, YEAR),
+    "1650-60": (1650, 1660, YEAR),
+    "1650–60": (1650, 1660, YEAR),
+    "ca. 1650–60": (1650, 1660, YEAR),
+    "c. 1900": (1900, 1900, YEAR),
+    # ISO dates: the month is not an abbreviated end year
+    "1887-05-12": (1887, 1887, YEAR),
+    " 1921-11-30 ": (1921, 1921, YEAR),
+    # Ranges that could be read as a year and month
+    "1910-12": (1910, 1912, YEAR),
+    "1905-07": (1905, 1907, YEAR),
+    "1600-01": (1600, 1601, YEAR),
+    "1880s": (1880, 1889, DECADE),
+    "19th century": (1801, 1900, CENTURY),
+    "late 18th century": (1767, 1800, CENTURY),
+    "17th–18th centuries": (1601, 1800, CENTURY),
+    "Edo period (1615–1868)": (1615, 1868, YEAR),
+    "500 BC": (-500, -500, YEAR),
+    # Not dates, or not valid ranges
+    "1905-1900": (None, None, None),
+    "n.d.": (None, None, None),
+}
+
+# Dates of the sources writing them in the ISO format only (`months`)
+MONTH_CASES = {
+    **CASES,
+    "1889-06": (1889, 1889, YEAR),
+    "1910-12": (1910, 1910, YEAR),
+    "1905-07": (1905, 1905, YEAR),
+    "1600-01": (1600, 1600, YEAR),
+    "1650-60": (1650, 1660, YEAR),
+}
+
+
+def check(cases, months):
+    """Return the dates of `cases` not parsed as expected."""
+    dates = pd.Series(list(cases))
+    parsed = parse_dates(dates, months=months)
+    failures = []
+    for text, row in zip(dates, parsed[DATE_FIELDS].itertuples(index=False)):
+        actual = tuple(None if pd.isna(value) else int(value) for value in row)
+        if actual != cases[text]:
+            failures.append(
+                f"{text!r} (months={months}): expected {cases[text]}, got {actual}"
+            )
+    return failures
+
+
+if __name__ == "__main__":
+    failures = check(CASES, months=False) + check(MONTH_CASES, months=True)
+    if failures:
+        raise SystemExit("\n".join(failures))
+    print(f"All {len(CASES) + len(MONTH_CASES)} dates are parsed as expected")
@@ -0,0 +1,137 @@
+import re
+from functools import lru_cache
+import numpy as np
+import pandas as pd
+
+# Bump when the parsing rules change, to invalidate the cached unify fragments
+PARSER_VERSION = 3
+
+# Columns returned by `parse_dates`
+DATE_FIELDS = ["year_start", "year_end", "date_precision"]
+# Precision of a parsed date, in years
+YEAR, DECADE, CENTURY = 1, 10, 100
+
+# ISO dates ("1887-05-12") are a single year. They are matched first, since
+# the month would otherwise read as an abbreviated end year
+ISO_DATE = re.compile(r"^\s*(\d{4})-(?:0[1-9]|1[0-2])-(?:0[1-9]|[12]\d|3[01])\s*$")
+# Also a year and month ("1889-06"), for the sources writing their dates in the
+# ISO format only. Elsewhere "1910-12" is the range 1910-1912
+ISO_MONTH = re.compile(
+    r"^\s*(\d{4})-(?:0[1-9]|1[0-2])(?:-(?:0[1-9]|[12]\d|3[01]))?\s*$"
+)
+
+# Fast path: a plain year ("1887", or "1887.0" from a float column) or a plain
+# range of years ("1900-1905", "1650–60")
+PLAIN_DATE = re.compile(r"^\s*(\d{3,4})(?:\.0)?\s*(?:[-–—/]\s*(\d{1,4}))?\s*$")
+
+DASHES = str.maketrans({"–": "-", "—": "-", "‒": "-", "−": "-"})
+BCE = re.compile(r"\b(?:b\.?\s?c\.?(?:e\.?)?)(?!\w)")
+CENTURY_RANGE = re.compile(
+    r"(?:(early|mid|late)[\s-]+)?(\d{1,2})(?:st|nd|rd|th)?"
+    r"(?:\s*-\s*(?:(early|mid|late)[\s-]+)?(\d{1,2})(?:st|nd|rd|th)?)?"
+    r"\s+centur(?:y|ies)"
+)
+DECADE_RANGE = re.compile(r"\b(\d{3})0'?s\b")
+YEAR_RANGE = re.compile(r"(?<!\d)(\d{3,4})(?!\d)(?:\s*-\s*(\d{1,4})(?!\d))?")
+# Part of a century covered by "early", "mid" and "late"
+CENTURY_PARTS = {None: (1, 100), "early": (1, 33), "mid": (34, 66), "late": (67, 100)}
+
+
+def expand_end(start, end):
+    """Complete an abbreviated end year: (1650, "60") gives 1660."""
+    if len(end) < len(str(start)):
+        end = str(start)[: len(str(start)) - len(end)] + end
+    return int(end)
+
+
+@lru_cache(maxsize=65536)
+def parse_date_text(text, months=False):
+    """Parse a free-text date into (year_start, year_end, precision).
+
+    Handles ISO dates ("1887-05-12", and "1889-06" with `months`), approximate
+    dates ("ca. 1650"), decades ("1880s"), centuries ("late 18th century",
+    "17th–18th centuries"), BCE dates and years embedded in longer texts
+    ("Edo period (1615–1868)"). Returns None if no year is found.
+    """
+    match = (ISO_MONTH if months else ISO_DATE).match(text)
+    if match:
+        year = int(match.group(1))
+        return year, year, YEAR
+
+    text = text.lower().translate(DASHES)
+    sign = -1 if BCE.search(text) else 1
+
+    match = CENTURY_RANGE.search(text)
+    if match:
+        first_part, first, last_part, last = match.groups()
+        if last is None:
+            last, last_part = first, first_part
+        start = (int(first) - 1) * 100 + CENTURY_PARTS[first_part][0]
+        end = (int(last) - 1) * 100 + CENTURY_PARTS[last_part][1]
+        return with_era(sign, start, end, CENTURY)
+
+    match = DECADE_RANGE.search(text)
+    if match:
+        start = int(match.group(1)) * 10
+        return with_era(sign, start, start + 9, DECADE)
+
+    match = YEAR_RANGE.search(text)
+    if match:
+        start = int(match.group(1))
+        end = expand_end(start, match.group(2)) if match.group(2) else start
+        return with_era(sign, start, end, YEAR)
+
+    return None
+
+
+def with_era(sign, start, end, precision):
+    # BCE centuries count backwards, so their range starts from the last year
+    if sign < 0:
+        start, end = sorted((-start, -end))
+    return start, end, precision
+
+
+def parse_dates(dates, months=False):
+    """Parse a column of free-text dates into numeric year ranges.
+
+    Returns a DataFrame with the Int64 columns year_start, year_end and
+    date_precision (1, 10 or 100 years) aligned with `dates`; dates that
+    cannot be parsed are missing. With `months`, "YYYY-MM" is a year and month
+    rather than a range. Every distinct value is parsed once: plain years and
+    ranges with vectorized string operations, the other formats with the
+    memoized `parse_date_text`.
+    """
+    codes, uniques = pd.factorize(dates)
+    # Format the values like the XML does, e.g. a float column gives "1887.0"
+    uniques = pd.Series(uniques, dtype=object).map(str)
+
+    # Parsed (year_start, year_end, precision) of every distinct value, and a
+    # last missing row for the missing dates (factorized to -1)
+    values = np.zeros((len(uniques) + 1, len(DATE_FIELDS)), dtype="int64")
+    missing = np.ones(len(uniques) + 1, dtype=bool)
+
+    iso_years = uniques.str.extract(ISO_MONTH if months else ISO_DATE)[0]
+    plain = uniques.str.extract(PLAIN_DATE)
+    for i, (iso_year, year, suffix) in enumerate(zip(iso_years, plain[0], plain[1])):
+        if isinstance(iso_year, str):
+            parsed = (int(iso_year), int(iso_year), YEAR)
+        elif isinstance(year, str):
+            start = int(year)
+            end = expand_end(start, suffix) if isinstance(suffix, str) else start
+            parsed = (start, end, YEAR)
+        else:
+            parsed = parse_date_text(uniques[i], months)
+        # A range written backwards ("1905-1900") is not a valid range
+        if parsed is not None and parsed[1] >= parsed[0]:
+            values[i] = parsed
+            missing[i] = False
+
+    values = np.take(values, codes, axis=0)
+    missing = np.take(missing, codes)
+    return pd.DataFrame(
+        {
+            field: pd.arrays.IntegerArray(values[:, column], missing.copy())
+            for column, field in enumerate(DATE_FIELDS)
+        },
+        index=dates.index,
+    )
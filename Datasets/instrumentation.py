@@ -0,0 +1,182 @@
+import os
+import sys
+import json
+import time
+import hashlib
+import cProfile
+import platform
+from concurrent.futures import Executor, Future
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+try:
+    import resource
+except ImportError:  # Not available on Windows, the peak memory is not reported
+    resource = None
+
+# Directory of the run reports and profiles, kept apart from the outputs since
+# these are also the inputs of other pipeline stages
+REPORTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "reports")
+
+
+def peak_rss_mb():
+    """Peak RSS of this process and of its largest finished child, in MB."""
+    if resource is None:
+        return None
+    peak = max(
+        resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss,
+    )
+    # ru_maxrss is in bytes on macOS and in kilobytes elsewhere
+    return round(peak / 1024**2 if sys.platform == "darwin" else peak / 1024, 1)
+
+
+def path_size(path):
+    """Size of a file, or of all the files under a directory."""
+    if os.path.isfile(path):
+        return os.path.getsize(path)
+    return sum(
+        os.path.getsize(os.path.join(directory, file))
+        for directory, _, files in os.walk(path)
+        for file in files
+    )
+
+
+class InlineExecutor(Executor):
+    """Executor running every task in the calling thread when it is submitted."""
+
+    def submit(self, fn, /, *args, **kwargs):
+        future = Future()
+        try:
+            future.set_result(fn(*args, **kwargs))
+        except BaseException as exc:
+            future.set_exception(exc)
+        return future
+
+
+def executor(pool, profile=False, **kwargs):
+    """Return `pool(**kwargs)`, or an `InlineExecutor` when profiling.
+
+    cProfile only sees the calling thread, so the tasks of a profiled hot loop
+    are run in it instead of in worker threads or processes.
+    """
+    return InlineExecutor() if profile else pool(**kwargs)
+
+
+class Phase:
+    """Counters of one phase of a run, updated by the script as it goes."""
+
+    def __init__(self, name):
+        self.name = name
+        self.records = 0
+        self.bytes_read = 0
+        self.bytes_written = 0
+
+    def read(self, *paths):
+        """Count the size of input files or directories."""
+        self.bytes_read += sum(path_size(path) for path in paths)
+
+    def wrote(self, *paths):
+        """Count the size of output files or directories."""
+        self.bytes_written += sum(path_size(path) for path in paths)
+
+
+class RunReport:
+    """Machine-readable report of a script run, saved as JSON.
+
+    The run is split into phases, each with its wall time, records processed,
+    records/s, bytes read and written and the peak RSS so far (including the
+    finished worker processes). Use it as a context manager: the report is
+    saved when the run ends, also when it fails, as
+    `<reports_dir>/<script>/<name>.report.json` (`REPORTS_DIR` by default).
+    The name is made of the output's directory and file names and a hash of
+    its absolute path, so that outputs with the same file name get their own
+    reports.
+
+    With `profile`, the phases marked as `hot` are run under cProfile and
+    their stats are dumped next to the report as `<name>.<phase>.prof`, to be
+    read with `pstats` or snakeviz. Only the calling thread is profiled.
+    """
+
+    def __init__(self, script, output_path, profile=False, reports_dir=None):
+        self.script = script
+        self.output_path = output_path
+        self.profile = profile
+        self.reports_dir = os.path.join(reports_dir or REPORTS_DIR, script)
+        output_path = os.path.abspath(output_path)
+        self.name = "-".join(
+            [
+                os.path.basename(os.path.dirname(output_path)),
+                os.path.basename(output_path),
+                hashlib.sha1(output_path.encode()).hexdigest()[:8],
+            ]
+        )
+        self.phases = []
+        self.report = {
+            "script": script,
+            "argv": sys.argv,
+            "python": platform.python_version(),
+            "started": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        }
+        self.start = time.perf_counter()
+
+    def path(self, suffix):
+        """Path of a file of this run in the reports directory."""
+        return os.path.join(self.reports_dir, f"{self.name}.{suffix}")
+
+    @property
+    def report_path(self):
+        return self.path("report.json")
+
+    @contextmanager
+    def phase(self, name, hot=False):
+        """Time a phase of the run. Yields its `Phase` counters."""
+        phase = Phase(name)
+        profiler = cProfile.Profile() if hot and self.profile else None
+        start = time.perf_counter()
+        if profiler:
+            profiler.enable()
+        try:
+            yield phase
+        finally:
+            if profiler:
+                profiler.disable()
+                os.makedirs(self.reports_dir, exist_ok=True)
+                profiler.dump_stats(self.path(f"{name}.prof"))
+            elapsed = time.perf_counter() - start
+            self.phases.append(
+                {
+                    "name": name,
+                    "seconds": round(elapsed, 3),
+                    "records": phase.records,
+                    "records_per_s": (
+                        round(phase.records / elapsed, 1) if elapsed else None
+                    ),
+                    "bytes_read": phase.bytes_read,
+                    "bytes_written": phase.bytes_written,
+                    "peak_rss_mb": peak_rss_mb(),
+                }
+            )
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.report["status"] = "ok" if exc_type is None else "failed"
+        if exc_type is not None:
+            self.report["error"] = f"{exc_type.__name__}: {exc_value}"
+        self.save()
+        return False
+
+    def save(self):
+        """Write the report, replacing any report of a previous run."""
+        self.report.update(
+            seconds=round(time.perf_counter() - self.start, 3),
+            peak_rss_mb=peak_rss_mb(),
+            phases=self.phases,
+        )
+        os.makedirs(self.reports_dir, exist_ok=True)
+        with open(f"{self.report_path}.tmp", "w") as f:
+            json.dump(self.report, f, indent=2)
+        os.replace(f"{self.report_path}.tmp", self.report_path)
+        print(f"Run report saved as '{self.report_path}'")
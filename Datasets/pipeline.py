@@ -0,0 +1,480 @@
+import os
+import sys
+import json
+import time
+import hashlib
+import argparse
+import subprocess
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from Datasets.unify_datasets import SOURCES, file_fingerprint
+
+DATASETS_DIR = os.path.dirname(os.path.abspath(__file__))
+# The stages are run as modules of the Datasets package, from its parent
+REPO_DIR = os.path.dirname(DATASETS_DIR)
+
+# Version of the state file, bump to rerun every stage
+STATE_VERSION = 1
+
+
+def source_csv(root_dir, name):
+    """Path of the metadata CSV of a source, where unify_datasets.py reads it."""
+    source = next(source for source in SOURCES if source["name"] == name)
+    return os.path.join(root_dir, source["csv"])
+
+
+def build_stages(args):
+    """Stages of the build, in a valid execution order.
+
+    Every stage runs a script, as a module, with explicit input and output
+    paths. A source stage is only included when its raw data is given;
+    otherwise its CSV is expected to be in place already, as for Ukiyo-e which
+    has no script.
+    """
+    root_dir = args.root_dir
+    stages = []
+
+    def stage(name, module, arguments, inputs, outputs):
+        stages.append(
+            {
+                "name": name,
+                "command": [sys.executable, "-m", f"Datasets.{module}"]
+                + [str(argument) for argument in arguments],
+                "inputs": inputs,
+                "outputs": outputs,
+            }
+        )
+
+    if args.gac_root:
+        csv_path = source_csv(root_dir, "GAC")
+        stage(
+            "gac",
+            "GAC.convert_metadata_to_csv",
+            ["--root", args.gac_root, "--csv_path", csv_path],
+            [args.gac_root],
+            [csv_path],
+        )
+    if args.rijksmuseum_xml_path:
+        csv_path = source_csv(root_dir, "Rijksmuseum")
+        stage(
+            "rijksmuseum",
+            "Rijksmuseum.convert_metadata_to_csv",
+            ["--xml_path", args.rijksmuseum_xml_path, "--csv_path", csv_path],
+            [args.rijksmuseum_xml_path],
+            [csv_path],
+        )
+    if args.met_database:
+        chunk = os.path.join(args.met_chunks_dir, "met_metadata.csv")
+        stage(
+            "met_extract",
+            "Met.extract_metadata_concurrent",
+            ["--database", args.met_database, "--outfile", chunk],
+            [args.met_database],
+            [chunk],
+        )
+    if args.met_database or os.path.isdir(args.met_chunks_dir):
+        csv_path = source_csv(root_dir, "Met")
+        stage(
+            "met_merge",
+            "Met.merge_metadata_files",
+            ["--metadata_directory", args.met_chunks_dir, "--output_file", csv_path],
+            [args.met_chunks_dir],
+            [csv_path],
+        )
+    if args.semart_dir:
+        csv_path = source_csv(root_dir, "SemArt")
+        stage(
+            "semart",
+            "SemArt.merge_dataset_splits",
+            ["--root", args.semart_dir, "--output_dir", csv_path],
+            [args.semart_dir],
+            [csv_path],
+        )
+    if args.wikiart_dataset:
+        csv_path = source_csv(root_dir, "WikiArt")
+        stage(
+            "wikiart",
+            "Wikiart.get_wikiart_metadata",
+            ["--dataset", args.wikiart_dataset, "--output_dir", csv_path],
+            # A dataset on the Hub cannot be fingerprinted, use --force to update
+            [args.wikiart_dataset] if os.path.exists(args.wikiart_dataset) else [],
+            [csv_path],
+        )
+
+    unify_arguments = ["--root_dir", root_dir, "--output_file", args.xml_file]
+    unify_outputs = [args.xml_file]
+    for option in ["parquet_file", "search_index"]:
+        if getattr(args, option):
+            unify_arguments += [f"--{option}", getattr(args, option)]
+            unify_outputs.append(getattr(args, option))
+    stage(
+        "unify",
+        "unify_datasets",
+        unify_arguments,
+        [source_csv(root_dir, source["name"]) for source in SOURCES],
+        unify_outputs,
+    )
+
+    stage(
+        "artists",
+        "Artists.extract_unique_artists",
+        [
+            "--xml_file",
+            args.xml_file,
+            "--output_file",
+            args.artists_file,
+            "--streaming",
+        ],
+        [args.xml_file],
+        [args.artists_file],
+    )
+    if args.artist_clusters:
+        stage(
+            "dedup",
+            "Artists.deduplicate_artists",
+            ["--input_file", args.artists_file, "--output_file", args.artist_clusters],
+            [args.artists_file],
+            [args.artist_clusters],
+        )
+    if args.artist_index:
+        stage(
+            "artist_index",
+            "Artists.artist_index",
+            ["--index_file", args.artist_index, "build", "--xml_file", args.xml_file],
+            [args.xml_file],
+            [args.artist_index],
+        )
+    return stages
+
+
+def is_within(path, directory):
+    path, directory = os.path.abspath(path), os.path.abspath(directory)
+    return os.path.commonpath([path, directory]) == directory
+
+
+def dependencies(stages):
+    """Map every stage to the stages producing (a part of) its inputs."""
+    return {
+        stage["name"]: [
+            other["name"]
+            for other in stages
+            if other is not stage
+            and any(
+                is_within(output, path)
+                for output in other["outputs"]
+                for path in stage["inputs"]
+            )
+        ]
+        for stage in stages
+    }
+
+
+def fingerprint(path, previous=None):
+    """Fingerprint of a file, or of the listing of a directory.
+
+    Files are hashed like the unify cache does. Directories, e.g. thousands of
+    GAC metadata files, are fingerprinted by the names, sizes and mtimes of
+    their files without reading them.
+    """
+    if os.path.isfile(path):
+        return file_fingerprint(path, previous)
+
+    digest = hashlib.sha256()
+    for directory, directories, files in os.walk(path):
+        directories.sort()
+        for file in sorted(files):
+            stat = os.stat(os.path.join(directory, file))
+            relative_path = os.path.relpath(os.path.join(directory, file), path)
+            digest.update(
+                f"{relative_path}\0{stat.st_size}\0{stat.st_mtime_ns}\n".encode()
+            )
+    return {"sha256": digest.hexdigest()}
+
+
+def fingerprints(paths, previous=None):
+    previous = previous or {}
+    return {
+        path: fingerprint(path, previous.get(path)) if os.path.exists(path) else None
+        for path in paths
+    }
+
+
+def is_fresh(stage, entry, inputs):
+    """Check whether the outputs of a stage are up to date."""
+    if not entry or entry["command"] != stage["command"]:
+        return False
+    if any(
+        (entry["inputs"].get(path) or {}).get("sha256") != (value or {}).get("sha256")
+        for path, value in inputs.items()
+    ):
+        return False
+    # The outputs must still be the ones the stage wrote
+    outputs = fingerprints(stage["outputs"], entry["outputs"])
+    return all(
+        value is not None and value["sha256"] == entry["outputs"][path]["sha256"]
+        for path, value in outputs.items()
+    )
+
+
+def load_state(state_file):
+    try:
+        with open(state_file, "r") as f:
+            state = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+    return state["stages"] if state.get("version") == STATE_VERSION else {}
+
+
+def save_state(state_file, stages):
+    # Replace the state atomically so that an interrupted run cannot corrupt it
+    with open(f"{state_file}.tmp", "w") as f:
+        json.dump({"version": STATE_VERSION, "stages": stages}, f, indent=2)
+    os.replace(f"{state_file}.tmp", state_file)
+
+
+def run_stage(stage, log_dir):
+    """Run the command of a stage, logging its output. Returns its duration."""
+    for output in stage["outputs"]:
+        os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    start = time.perf_counter()
+    with open(os.path.join(log_dir, f"{stage['name']}.log"), "w") as log:
+        subprocess.run(
+            stage["command"],
+            cwd=REPO_DIR,
+            stdout=log,
+            stderr=subprocess.STDOUT,
+            check=True,
+        )
+    return time.perf_counter() - start
+
+
+def run_pipeline(stages, state_file, jobs=None, force=(), dry_run=False):
+    """Run the stages whose inputs, outputs or command changed.
+
+    A stage is started as soon as the stages it depends on are done, so the
+    independent source stages run concurrently. Whether a stage is up to date
+    is only decided then, from the content of its inputs: when a dependency
+    reruns but writes the same outputs, the stage is still skipped.
+    `force` lists the stages to run anyway, "all" forcing every stage.
+    """
+    depends_on = dependencies(stages)
+    produced = {
+        os.path.abspath(output) for stage in stages for output in stage["outputs"]
+    }
+    for stage in stages:
+        for path in stage["inputs"]:
+            if not os.path.exists(path) and not any(
+                is_within(output, path) for output in produced
+            ):
+                raise FileNotFoundError(
+                    f"Input '{path}' of stage '{stage['name']}' does not exist "
+                    "and no stage produces it"
+                )
+
+    state = load_state(state_file)
+    log_dir = os.path.join(os.path.dirname(os.path.abspath(state_file)), "logs")
+    os.makedirs(log_dir, exist_ok=True)
+
+    status = {}
+    pending = {stage["name"]: stage for stage in stages}
+    running = {}
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        while pending or running:
+            for name, stage in list(pending.items()):
+                if any(
+                    status.get(dependency) is None for dependency in depends_on[name]
+                ):
+                    continue  # Waiting for its dependencies
+                del pending[name]
+                if any(
+                    status[dependency] == "failed" for dependency in depends_on[name]
+                ):
+                    status[name] = "failed"
+                    print(f"[{name}] not run, a dependency failed")
+                    continue
+                if dry_run and any(
+                    status[dependency] == "dry run" for dependency in depends_on[name]
+                ):
+                    status[name] = "dry run"
+                    print(f"[{name}] would run after its dependencies")
+                    continue
+
+                inputs = fingerprints(
+                    stage["inputs"], state.get(name, {}).get("inputs")
+                )
+                forced = "all" in force or name in force
+                if not forced and is_fresh(stage, state.get(name), inputs):
+                    status[name] = "skipped"
+                    print(f"[{name}] up to date")
+                elif dry_run:
+                    status[name] = "dry run"
+                    print(
+                        f"[{name}] would run: {subprocess.list2cmdline(stage['command'])}"
+                    )
+                else:
+                    print(f"[{name}] running")
+                    future = executor.submit(run_stage, stage, log_dir)
+                    running[future] = (name, inputs)
+
+            if not running:
+                continue
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name, inputs = running.pop(future)
+                stage = next(stage for stage in stages if stage["name"] == name)
+                try:
+                    elapsed = future.result()
+                    outputs = fingerprints(stage["outputs"])
+                    missing = [path for path, value in outputs.items() if value is None]
+                    if missing:
+                        raise FileNotFoundError(f"Outputs not written: {missing}")
+                except (subprocess.CalledProcessError, FileNotFoundError) as exc:
+                    status[name] = "failed"
+                    state.pop(name, None)
+                    print(
+                        f"[{name}] failed: {exc} "
+                        f"(see {os.path.join(log_dir, name + '.log')})"
+                    )
+                else:
+                    status[name] = "done"
+                    state[name] = {
+                        "command": stage["command"],
+                        "inputs": inputs,
+                        "outputs": outputs,
+                        "elapsed": elapsed,
+                    }
+                    print(f"[{name}] done in {elapsed:.1f}s")
+                if not dry_run:
+                    save_state(state_file, state)
+
+    return status
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Build the merged dataset, only rerunning the stages whose "
+        "inputs changed."
+    )
+    parser.add_argument(
+        "--root_dir",
+        type=str,
+        default=DATASETS_DIR,
+        help="Root directory of the source CSVs, as for unify_datasets.py.",
+    )
+    parser.add_argument(
+        "--gac_root", type=str, default=None, help="GAC artist folders."
+    )
+    parser.add_argument(
+        "--rijksmuseum_xml_path",
+        type=str,
+        default=None,
+        help="Directory of the Rijksmuseum metadata XML files.",
+    )
+    parser.add_argument(
+        "--met_database",
+        type=str,
+        default=None,
+        help="JSON list of the Met objects whose pages are extracted.",
+    )
+    parser.add_argument(
+        "--met_chunks_dir",
+        type=str,
+        default=None,
+        help="Directory of the Met chunk CSVs (defaults to Met/data/MET chunks).",
+    )
+    parser.add_argument(
+        "--semart_dir",
+        type=str,
+        default=None,
+        help="Directory containing the three SemArt splits.",
+    )
+    parser.add_argument(
+        "--wikiart_dataset",
+        type=str,
+        default=None,
+        help="WikiArt dataset name on Hugging Face or local dataset directory.",
+    )
+    parser.add_argument(
+        "--xml_file",
+        type=str,
+        default=None,
+        help="Path of the merged XML file (defaults to merged_datasets.xml in "
+        "the root directory).",
+    )
+    parser.add_argument(
+        "--parquet_file", type=str, default=None, help="Also write a Parquet file."
+    )
+    parser.add_argument(
+        "--search_index", type=str, default=None, help="Also build a search index."
+    )
+    parser.add_argument(
+        "--artists_file",
+        type=str,
+        default=None,
+        help="Path of the unique artists file (defaults to Artists/unique_artists.txt).",
+    )
+    parser.add_argument(
+        "--artist_clusters",
+        type=str,
+        default=None,
+        help="Also deduplicate the artists into this CSV file.",
+    )
+    parser.add_argument(
+        "--artist_index", type=str, default=None, help="Also build an artist index."
+    )
+    parser.add_argument(
+        "--state_file",
+        type=str,
+        default=None,
+        help="Path of the pipeline state (defaults to .pipeline/state.json in "
+        "the root directory).",
+    )
+    parser.add_argument(
+        "--jobs", type=int, default=None, help="Number of stages run concurrently."
+    )
+    parser.add_argument(
+        "--force",
+        nargs="*",
+        default=[],
+        help="Stages to run even if up to date, or 'all'.",
+    )
+    parser.add_argument(
+        "--dry_run",
+        action="store_true",
+        help="Only print the stages that would run.",
+    )
+    args = parser.parse_args()
+
+    # The stages run from the root of the repository
+    for option in [
+        "root_dir",
+        "gac_root",
+        "rijksmuseum_xml_path",
+        "met_database",
+        "met_chunks_dir",
+        "semart_dir",
+        "xml_file",
+        "parquet_file",
+        "search_index",
+        "artists_file",
+        "artist_clusters",
+        "artist_index",
+        "state_file",
+    ]:
+        if getattr(args, option):
+            setattr(args, option, os.path.abspath(getattr(args, option)))
+    if args.wikiart_dataset and os.path.exists(args.wikiart_dataset):
+        args.wikiart_dataset = os.path.abspath(args.wikiart_dataset)
+    if not args.met_chunks_dir:
+        args.met_chunks_dir = os.path.join(args.root_dir, "Met", "data", "MET chunks")
+    if not args.xml_file:
+        args.xml_file = os.path.join(args.root_dir, "merged_datasets.xml")
+    if not args.artists_file:
+        args.artists_file = os.path.join(args.root_dir, "Artists", "unique_artists.txt")
+    if not args.state_file:
+        args.state_file = os.path.join(args.root_dir, ".pipeline", "state.json")
+    os.makedirs(os.path.dirname(os.path.abspath(args.state_file)), exist_ok=True)
+
+    stages = build_stages(args)
+    status = run_pipeline(stages, args.state_file, args.jobs, args.force, args.dry_run)
+    if "failed" in status.values():
+        sys.exit(1)
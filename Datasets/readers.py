@@ -0,0 +1,153 @@
+import io
+
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+except ImportError:  # The pandas C parser is used instead
+    pa = pa_csv = None
+
+# Strings read as missing values, the defaults of pandas.read_csv
+NA_VALUES = [
+    "",
+    "#N/A",
+    "#N/A N/A",
+    "#NA",
+    "-1.#IND",
+    "-1.#QNAN",
+    "-NaN",
+    "-nan",
+    "1.#IND",
+    "1.#QNAN",
+    "<NA>",
+    "N/A",
+    "NA",
+    "NULL",
+    "NaN",
+    "None",
+    "n/a",
+    "nan",
+    "null",
+]
+
+# Text columns of every source. Declaring them spares the type inference, and
+# the date columns are left out since some sources store plain years there
+TEXT_COLUMNS = {
+    "Met": ["description", "title", "artist", "medium"],
+    "SemArt": ["IMAGE_FILE", "DESCRIPTION", "AUTHOR", "TITLE", "TECHNIQUE", "TYPE"],
+    "Rijksmuseum": ["filename", "title", "creator", "type", "description"],
+    "Ukiyo-e": ["image_file", "description", "artistString", "title", "type"],
+    "WikiArt": ["description", "filename", "artist", "title", "genre"],
+    "GAC": ["artwork_path", "main_text", "creator", "title", "type"],
+}
+
+# Options of `read_csv` for every source
+READ_OPTIONS = {
+    name: {"dtype": dict.fromkeys(columns, "str")}
+    for name, columns in TEXT_COLUMNS.items()
+}
+READ_OPTIONS["Ukiyo-e"]["index_col"] = 0
+# The original SemArt splits are latin-1 encoded TSV files
+READ_OPTIONS["SemArt split"] = {
+    "sep": "\t",
+    "encoding": "latin-1",
+    "dtype": READ_OPTIONS["SemArt"]["dtype"],
+}
+
+
+def read_csv(
+    path,
+    sep=",",
+    encoding="utf-8",
+    dtype=None,
+    usecols=None,
+    exclude=None,
+    index_col=None,
+    engine=None,
+):
+    """Read a CSV file into the same DataFrame as `pandas.read_csv`.
+
+    With the "pyarrow" engine (the default when pyarrow is installed), the
+    file is split into values by the multithreaded Arrow CSV reader,
+    supporting quoted values spanning several lines. The columns that are not
+    text are then converted by the pandas C parser, so that their types and
+    floats are exactly those of `pandas.read_csv`. Files that Arrow cannot
+    read, e.g. with rows missing values, are read by the C parser only.
+
+    `dtype` maps column names to "str" to skip their type inference, and
+    `usecols` lists the columns to read (or `exclude` the columns to skip) so
+    that the others are not even converted.
+    """
+    if engine is None:
+        engine = "pyarrow" if pa_csv is not None else "c"
+
+    # Let pandas name the columns, e.g. "Unnamed: 42" for an empty header
+    header = pd.read_csv(path, sep=sep, encoding=encoding, nrows=0)
+    names = list(header.columns)
+    if exclude:
+        usecols = [name for name in usecols or names if name not in exclude]
+
+    if engine == "pyarrow":
+        try:
+            df = read_with_arrow(path, sep, encoding, dtype, names, usecols)
+        except pa.ArrowInvalid:
+            df = None
+        if df is not None:
+            if index_col is not None:
+                index_name = df.columns[index_col]
+                df = df.set_index(index_name)
+                if index_name.startswith("Unnamed: "):
+                    df.index.name = None
+            return df
+
+    return pd.read_csv(
+        path,
+        sep=sep,
+        encoding=encoding,
+        dtype=dtype,
+        usecols=usecols,
+        index_col=index_col,
+    )
+
+
+def read_with_arrow(path, sep, encoding, dtype, names, usecols):
+    """Read the columns as text with Arrow, then type them with pandas.
+
+    Returns None for a file without rows, left to the C parser.
+    """
+    columns = [name for name in names if usecols is None or name in usecols]
+    table = pa_csv.read_csv(
+        path,
+        read_options=pa_csv.ReadOptions(
+            encoding=encoding, column_names=names, skip_rows=1
+        ),
+        parse_options=pa_csv.ParseOptions(delimiter=sep, newlines_in_values=True),
+        convert_options=pa_csv.ConvertOptions(
+            column_types={name: pa.string() for name in columns},
+            include_columns=columns,
+            null_values=NA_VALUES,
+            strings_can_be_null=True,
+            quoted_strings_can_be_null=True,
+        ),
+    )
+    if table.num_rows == 0:
+        return None
+
+    df = table.to_pandas()
+    string_columns = {name for name, kind in (dtype or {}).items() if kind == "str"}
+    inferred = [name for name in columns if name not in string_columns]
+    if inferred:
+        # Write the other columns back as CSV, every value quoted, and let the
+        # C parser infer their types as it would from the original file
+        buffer = io.BytesIO()
+        pa_csv.write_csv(
+            table.select(inferred),
+            buffer,
+            pa_csv.WriteOptions(include_header=False, quoting_style="all_valid"),
+        )
+        buffer.seek(0)
+        typed = pd.read_csv(buffer, header=None, names=inferred)
+        for name in inferred:
+            df[name] = typed[name]
+    return df
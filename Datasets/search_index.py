@@ -0,0 +1,168 @@
+import os
+import time
+import sqlite3
+import argparse
+
+from Datasets.dates import DATE_FIELDS
+
+# Searchable fields of the unified datasets, in the column order of the index
+SEARCH_FIELDS = ["title", "artist", "description", "technique"]
+# bm25 weights of the columns of the index (matches in titles and artist names
+# rank higher than matches in long descriptions). The dataset is not indexed
+WEIGHTS = {
+    "dataset": 0.0,
+    "title": 5.0,
+    "artist": 5.0,
+    "description": 1.0,
+    "technique": 2.0,
+}
+
+
+def write_fragment(fragment_file, rows):
+    """Write the searchable rows of one dataset to a plain SQLite fragment.
+
+    `rows` are (dataset, position, image_file, title, artist, description,
+    technique, year_start, year_end, date_precision) tuples. The fragments are
+    merged into the full-text index by `build_index`.
+    """
+    if os.path.exists(fragment_file):
+        os.remove(fragment_file)
+    db = sqlite3.connect(fragment_file)
+    db.execute(
+        "CREATE TABLE artworks (dataset TEXT, position INTEGER, image_file TEXT, "
+        + ", ".join(f"{field} TEXT" for field in SEARCH_FIELDS)
+        + ", "
+        + ", ".join(f"{field} INTEGER" for field in DATE_FIELDS)
+        + ")"
+    )
+    db.executemany(f"INSERT INTO artworks VALUES ({', '.join('?' * 10)})", rows)
+    db.commit()
+    db.close()
+
+
+def build_index(index_file, fragment_files):
+    """Build the FTS5 index from the per-dataset fragments, in the given order.
+
+    The index is written next to `index_file` and moved into place when
+    complete, so queries never see a partial index.
+    """
+    start = time.perf_counter()
+    tmp_file = f"{index_file}.tmp"
+    if os.path.exists(tmp_file):
+        os.remove(tmp_file)
+
+    db = sqlite3.connect(tmp_file)
+    # The other columns are only stored. The dataset is filtered on with an
+    # equality, and indexing it would make the dataset names match queries
+    db.execute(
+        "CREATE VIRTUAL TABLE artworks USING fts5(dataset UNINDEXED, "
+        + ", ".join(SEARCH_FIELDS)
+        + ", position UNINDEXED, image_file UNINDEXED, "
+        + ", ".join(f"{field} UNINDEXED" for field in DATE_FIELDS)
+        + ", tokenize = 'unicode61 remove_diacritics 2')"
+    )
+    columns = ", ".join(
+        ["dataset", *SEARCH_FIELDS, "position", "image_file", *DATE_FIELDS]
+    )
+    for fragment_file in fragment_files:
+        db.execute("ATTACH DATABASE ? AS fragment", (fragment_file,))
+        db.execute(
+            f"INSERT INTO artworks ({columns}) "
+            f"SELECT {columns} FROM fragment.artworks ORDER BY position"
+        )
+        db.commit()
+        db.execute("DETACH DATABASE fragment")
+
+    # Merge the b-trees of the index for faster queries
+    db.execute("INSERT INTO artworks (artworks) VALUES ('optimize')")
+    count = db.execute("SELECT COUNT(*) FROM artworks").fetchone()[0]
+    db.commit()
+    db.close()
+    os.replace(tmp_file, index_file)
+
+    elapsed = time.perf_counter() - start
+    print(
+        f"Indexed {count} artworks for full-text search in {elapsed:.1f}s "
+        f"({count / elapsed if elapsed else 0:.0f} artworks/s)"
+    )
+    return count
+
+
+def search(index_file, query, dataset=None, years=None, limit=20):
+    """Return the best matches of an FTS5 query, best first.
+
+    With `years`, a (start, end) tuple, only artworks whose parsed date range
+    overlaps it are returned. Every hit is a (dataset, position, image_file,
+    title, artist, year_start, year_end, snippet of the description) tuple.
+    """
+    weights = ", ".join(str(WEIGHTS[field]) for field in ["dataset", *SEARCH_FIELDS])
+    sql = (
+        "SELECT dataset, position, image_file, title, artist, year_start, "
+        "year_end, snippet(artworks, 3, '[', ']', '...', 12) FROM artworks "
+        "WHERE artworks MATCH ?"
+    )
+    params = [query]
+    if dataset is not None:
+        sql += " AND dataset = ?"
+        params.append(dataset)
+    if years is not None:
+        sql += " AND year_start <= ? AND year_end >= ?"
+        params.extend([years[1], years[0]])
+    sql += f" ORDER BY bm25(artworks, {weights}) LIMIT ?"
+    params.append(limit)
+
+    db = sqlite3.connect(f"file:{index_file}?mode=ro", uri=True)
+    try:
+        return db.execute(sql, params).fetchall()
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Search the titles, artists, descriptions and techniques "
+        "of the unified datasets."
+    )
+    parser.add_argument(
+        "query",
+        type=str,
+        help='FTS5 query, e.g. "portrait AND woman" or "artist:cassatt".',
+    )
+    parser.add_argument(
+        "--index_file",
+        type=str,
+        default=os.path.join(os.getcwd(), "search_index.sqlite"),
+        help="Path to the index built by unify_datasets.py --search_index.",
+    )
+    parser.add_argument(
+        "--dataset",
+        type=str,
+        default=None,
+        help="Only return artworks of this dataset.",
+    )
+    parser.add_argument(
+        "--years",
+        type=str,
+        default=None,
+        help="Only return artworks dated within this period, e.g. 1600-1700.",
+    )
+    parser.add_argument("--limit", type=int, default=20, help="Maximum number of hits.")
+    args = parser.parse_args()
+
+    years = None
+    if args.years:
+        first, _, last = args.years.partition("-")
+        years = (int(first), int(last or first))
+
+    start = time.perf_counter()
+    hits = search(args.index_file, args.query, args.dataset, years, args.limit)
+    elapsed = time.perf_counter() - start
+    for hit in hits:
+        dataset, position, image_file, title, artist, year_start, year_end, snippet = (
+            hit
+        )
+        dates = f"{year_start}-{year_end}" if year_start is not None else "n.d."
+        print(f"{dataset}\t{position}\t{artist}\t{title}\t{dates}\t{image_file}")
+        if snippet:
+            print(f"\t{snippet}")
+    print(f"{len(hits)} hits in {elapsed * 1000:.1f} ms")
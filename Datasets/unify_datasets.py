@@ -1,65 +1,84 @@
 import os
+import time
+import json
+import hashlib
+import inspect
+import argparse
+import shutil
+import numpy as np
 import pandas as pd
 from tqdm import tqdm
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from xml.sax.saxutils import escape
-import re
+from pandas.api.types import infer_dtype, is_float_dtype, is_string_dtype
+from Datasets.search_index import SEARCH_FIELDS, build_index, write_fragment
+from Datasets.dates import DATE_FIELDS, PARSER_VERSION, parse_dates
+from Datasets.readers import READ_OPTIONS, read_csv
+from Datasets.instrumentation import RunReport, executor
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.parquet as pq
+except ImportError:  # Only needed for the optional Parquet output
+    pa = pc = pq = None
+
+# Default root directory of the source CSVs, and of the merged XML
+DATASETS_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Bump when the serialization of the fragments changes, to invalidate the cache
+FRAGMENTS_VERSION = 4
+
+# Translation table deleting the non-printable (C0 and C1 control) characters
+NON_PRINTABLE = dict.fromkeys([*range(0x00, 0x20), *range(0x7F, 0xA0)])
 
 
 def clean_text(text):
     """Remove non-printable characters from text."""
     if isinstance(text, str):
         # Remove non-printable characters
-        text = re.sub(r"[\x00-\x1F\x7F-\x9F]", "", text)
+        text = text.translate(NON_PRINTABLE)
     return text
 
 
-def main(root_dir=None, output_file=None):
-    if not root_dir:
-        root_dir = os.getcwd()
-        print(f"Root directory not provided. Using default: {root_dir}")
-    if not output_file:
-        output_file = os.path.join(os.getcwd(), "merged_datasets.xml")
+def clean_dataframe(df):
+    """Remove non-printable characters from the text columns of a DataFrame."""
+    for column in df.columns:
+        series = df[column]
+        if not is_string_dtype(series.dtype):
+            # Numeric and boolean columns cannot contain any text
+            continue
+        if infer_dtype(series, skipna=True) in ("string", "empty"):
+            df[column] = series.str.translate(NON_PRINTABLE)
+        else:
+            # Columns mixing strings with other objects are cleaned per value
+            df[column] = series.map(clean_text)
+    return df
 
-    # Step 1: Read CSV files into DataFrames
-    print("Reading CSV files into DataFrames...")
-    with tqdm(total=6, desc="Reading CSV files") as bar:
-        met_df = pd.read_csv(
-            os.path.join(root_dir, "Met/output/met_metadata_final.csv")
-        )
-        bar.update(1)
-
-        semart_df = pd.read_csv(
-            os.path.join(root_dir, "SemArt/output/semart_metadata_final.csv")
-        )
-        bar.update(1)
 
-        rijksmuseum_df = pd.read_csv(
-            os.path.join(root_dir, "Rijksmuseum/output/rijksmuseum_metadata_final.csv")
-        )
-        bar.update(1)
-
-        ukiyoe_df = pd.read_csv("Ukiyo-e/output/ukiyoe_metadata_final.csv", index_col=0)
-        bar.update(1)
+# Cleaning code, part of the configuration hash so that changing it
+# invalidates the cached fragments without bumping FRAGMENTS_VERSION
+CLEANING_HASH = hashlib.sha256(
+    (
+        inspect.getsource(clean_text)
+        + inspect.getsource(clean_dataframe)
+        + repr(sorted(NON_PRINTABLE))
+    ).encode("utf-8")
+).hexdigest()
 
-        wikiart_df = pd.read_csv(
-            os.path.join(root_dir, "Wikiart/output/wikiart_metadata_final.csv")
-        )
-        bar.update(1)
 
-        gac_df = pd.read_csv(
-            os.path.join(root_dir, "GAC/output/gac_metadata_final.csv")
-        )
-        bar.update(1)
-
-    # Step 2: Clean and rename overlapping fields
-    print("Cleaning and renaming overlapping fields...")
-
-    # Replace slashes with underscores in MET DataFrame columns
-    met_df.columns = met_df.columns.str.replace("/", "_")
-    met_df = met_df.apply(lambda col: col.apply(clean_text))
-
-    met_df.rename(
-        columns={
+# Source datasets, in the order they appear in the merged XML. For each source:
+#   - csv: path of the metadata CSV, relative to the root directory
+#   - read_csv: extra arguments for `pd.read_csv`
+#   - rename: mapping of the overlapping fields to the unified names
+#   - drop: columns to remove after renaming
+#   - iso_dates: whether the dates are ISO, so "1889-06" is a year and month
+SOURCES = [
+    {
+        "name": "Met",
+        "csv": "Met/output/met_metadata_final.csv",
+        "read_csv": READ_OPTIONS["Met"],
+        "rename": {
             "description": "description",
             "artist": "artist",
             "title": "title",
@@ -67,11 +86,13 @@ def main(root_dir=None, output_file=None):
             "medium": "technique",
             "type": "type",
         },
-        inplace=True,
-    )
-    semart_df = semart_df.apply(lambda col: col.apply(clean_text))
-    semart_df.rename(
-        columns={
+        "drop": [],
+    },
+    {
+        "name": "SemArt",
+        "csv": "SemArt/output/semart_metadata_final.csv",
+        "read_csv": READ_OPTIONS["SemArt"],
+        "rename": {
             "IMAGE_FILE": "image_file",
             "DESCRIPTION": "description",
             "AUTHOR": "artist",
@@ -83,11 +104,13 @@ def main(root_dir=None, output_file=None):
             "SPLIT": "split",
             "TIMEFRAME": "timeframe",
         },
-        inplace=True,
-    )
-    rijksmuseum_df = rijksmuseum_df.apply(lambda col: col.apply(clean_text))
-    rijksmuseum_df.rename(
-        columns={
+        "drop": [],
+    },
+    {
+        "name": "Rijksmuseum",
+        "csv": "Rijksmuseum/output/rijksmuseum_metadata_final.csv",
+        "read_csv": READ_OPTIONS["Rijksmuseum"],
+        "rename": {
             "filename": "image_file",
             "description": "description",
             "creator": "artist",
@@ -95,11 +118,13 @@ def main(root_dir=None, output_file=None):
             "date": "date",
             "type": "type",
         },
-        inplace=True,
-    )
-    ukiyoe_df = ukiyoe_df.apply(lambda col: col.apply(clean_text))
-    ukiyoe_df.rename(
-        columns={
+        "drop": [],
+    },
+    {
+        "name": "Ukiyo-e",
+        "csv": "Ukiyo-e/output/ukiyoe_metadata_final.csv",
+        "read_csv": READ_OPTIONS["Ukiyo-e"],
+        "rename": {
             "image_file": "image_file",
             "description": "description",
             "artistString": "artist",
@@ -107,13 +132,13 @@ def main(root_dir=None, output_file=None):
             "date": "date",
             "type": "type",
         },
-        inplace=True,
-    )
-    # Drop the 'Unnamed: 42' column
-    ukiyoe_df.drop("Unnamed: 42", axis=1, inplace=True)
-    wikiart_df = wikiart_df.apply(lambda col: col.apply(clean_text))
-    wikiart_df.rename(
-        columns={
+        "drop": ["Unnamed: 42"],
+    },
+    {
+        "name": "WikiArt",
+        "csv": "Wikiart/output/wikiart_metadata_final.csv",
+        "read_csv": READ_OPTIONS["WikiArt"],
+        "rename": {
             "description": "description",
             "filename": "image_file",
             "artist": "artist",
@@ -121,11 +146,13 @@ def main(root_dir=None, output_file=None):
             "date": "date",
             "genre": "type",
         },
-        inplace=True,
-    )
-    gac_df = gac_df.apply(lambda col: col.apply(clean_text))
-    gac_df.rename(
-        columns={
+        "drop": [],
+    },
+    {
+        "name": "GAC",
+        "csv": "GAC/output/gac_metadata_final.csv",
+        "read_csv": READ_OPTIONS["GAC"],
+        "rename": {
             "artwork_path": "image_file",
             "main_text": "description",
             "creator": "artist",
@@ -133,50 +160,501 @@ def main(root_dir=None, output_file=None):
             "date": "date",
             "type": "type",
         },
-        inplace=True,
+        "drop": [],
+        "iso_dates": True,
+    },
+]
+
+
+# Fields shared by all sources in the columnar output. The remaining fields of
+# each source are kept as a JSON object in the "extras" column.
+UNIFIED_FIELDS = [
+    "image_file",
+    "artist",
+    "title",
+    "date",
+    "technique",
+    "type",
+    "description",
+]
+UNIFIED_SCHEMA = (
+    pa.schema(
+        [("dataset", pa.string())]
+        + [(field, pa.string()) for field in UNIFIED_FIELDS]
+        + [(field, pa.int32()) for field in DATE_FIELDS]
+        + [("extras", pa.string())]
+    )
+    if pa is not None
+    else None
+)
+# Floats of the extras are written as text between these marks, which are then
+# removed with the quotes: to_json keeps 15 significant digits at most. The
+# cleaned values cannot contain them since they are control characters
+FLOAT_MARKS = ("\x02", "\x03")
+
+
+def process_source(source, root_dir, fragments_dir, formats=("xml",)):
+    """Read, clean and rename one source and write its fragments.
+
+    `formats` selects the fragments to write: the <Dataset> XML ("xml"), the
+    rows in the unified columnar schema ("parquet") and the searchable fields
+    for the full-text index ("sqlite"). Returns the number of rows.
+    """
+    # The dropped columns are not read at all
+    df = read_csv(
+        os.path.join(root_dir, source["csv"]),
+        exclude=source["drop"],
+        **source["read_csv"],
     )
 
-    # Step 3: Convert each DataFrame to XML and write incrementally
-    print("Writing DataFrames to XML incrementally...")
-    with open(output_file, "w", encoding="utf-8") as f:
-        f.write("<Datasets>\n")
+    # Replace slashes with underscores in the column names (used as XML tags)
+    df.columns = df.columns.str.replace("/", "_")
+    df = clean_dataframe(df)
+    df.rename(columns=source["rename"], inplace=True)
 
-        with tqdm(total=6, desc="Converting DataFrames to XML") as pbar:
-            write_dataframe_to_xml(f, met_df, "Met", "artwork")
-            pbar.update(1)
+    if "xml" in formats:
+        xml_path = os.path.join(fragments_dir, f"{source['name']}.xml")
+        with open(xml_path, "w", encoding="utf-8") as f:
+            write_dataframe_to_xml(f, df, source["name"], "artwork")
 
-            write_dataframe_to_xml(f, semart_df, "SemArt", "artwork")
-            pbar.update(1)
+    # Numeric year ranges of the free-text dates. They are added after the XML
+    # is written, so the XML keeps the original fields only
+    years = parse_dates(df["date"], months=source.get("iso_dates", False))
+    for field in DATE_FIELDS:
+        df[field] = years[field].array
+    dated = df["date"].notna().sum()
+    parsed = years["year_start"].notna().sum()
+    tqdm.write(
+        f"Parsed {parsed} of the {dated} dates of {source['name']} "
+        f"({parsed / dated if dated else 0:.1%})"
+    )
 
-            write_dataframe_to_xml(f, rijksmuseum_df, "Rijksmuseum", "artwork")
-            pbar.update(1)
+    if "parquet" in formats:
+        parquet_path = os.path.join(fragments_dir, f"{source['name']}.parquet")
+        pq.write_table(to_unified_table(df, source["name"]), parquet_path)
 
-            write_dataframe_to_xml(f, ukiyoe_df, "Ukiyo-e", "artwork")
-            pbar.update(1)
+    if "sqlite" in formats:
+        fields = ["image_file", *SEARCH_FIELDS]
+        write_fragment(
+            os.path.join(fragments_dir, f"{source['name']}.sqlite"),
+            zip(
+                [source["name"]] * len(df),
+                range(len(df)),
+                *(string_column(df, field) for field in fields),
+                *(integer_column(df, field) for field in DATE_FIELDS),
+            ),
+        )
 
-            write_dataframe_to_xml(f, wikiart_df, "WikiArt", "artwork")
-            pbar.update(1)
+    return len(df)
 
-            write_dataframe_to_xml(f, gac_df, "GAC", "artwork")
-            pbar.update(1)
 
-        f.write("</Datasets>\n")
+def string_column(df, field):
+    """Return a column as a list of strings, with None for missing values.
 
-    print(f"Merged XML saved as '{output_file}'.")
+    The values are formatted like the XML does; a field the source does not
+    have is all None.
+    """
+    if field not in df.columns:
+        return [None] * len(df)
+    return [None if pd.isna(value) else str(value) for value in df[field]]
 
 
-def write_dataframe_to_xml(file_handle, df, root_name, row_name):
-    """Write a DataFrame to an XML file incrementally."""
-    file_handle.write(f"  <{root_name}>\n")
-    for i, row in df.iterrows():
-        file_handle.write(f"    <{row_name}>\n")
-        for field, value in row.items():
-            file_handle.write(
-                f"      <{field}>{escape(clean_text(str(value)))}</{field}>\n"
+def integer_column(df, field):
+    """Return an integer column as a list of ints, with None for missing values."""
+    return [None if pd.isna(value) else int(value) for value in df[field]]
+
+
+def float_json(values):
+    """Return a float column as marked JSON numbers, with NaN for non-finite values.
+
+    Arrow writes the shortest text giving the same float back, like `repr`.
+    """
+    text = pc.cast(pa.array(values, pa.float64()), pa.string())
+    # Keep the float notation of whole numbers, "1.0" rather than "1"
+    text = pc.if_else(
+        pc.match_substring_regex(text, r"^-?\d+$"),
+        pc.binary_join_element_wise(text, ".0", ""),
+        text,
+    )
+    text = pc.binary_join_element_wise(FLOAT_MARKS[0], text, FLOAT_MARKS[1], "")
+    finite = np.isfinite(values.to_numpy(dtype="float64", na_value=np.nan))
+    return pd.Series(text.to_pandas(), index=values.index).where(finite)
+
+
+def to_unified_table(df, dataset):
+    """Convert a cleaned and renamed source DataFrame to the unified schema."""
+    columns = {"dataset": [dataset] * len(df)}
+    for field in UNIFIED_FIELDS:
+        columns[field] = string_column(df, field)
+
+    for field in DATE_FIELDS:
+        columns[field] = integer_column(df, field)
+
+    extra_fields = [
+        field
+        for field in df.columns
+        if field not in UNIFIED_FIELDS and field not in DATE_FIELDS
+    ]
+    if extra_fields and len(df):
+        extras = df[extra_fields].copy()
+        for field in extra_fields:
+            if is_float_dtype(extras[field].dtype):
+                extras[field] = float_json(extras[field])
+        extras = extras.to_json(orient="records", lines=True, force_ascii=False)
+        # Remove the marks, escaped by to_json, and the quotes around the floats
+        extras = extras.replace('"\\u0002', "").replace('\\u0003"', "")
+        columns["extras"] = extras.rstrip("\n").split("\n")
+    else:
+        columns["extras"] = [None] * len(df)
+
+    return pa.table(
+        {
+            name: pa.array(values, UNIFIED_SCHEMA.field(name).type)
+            for name, values in columns.items()
+        },
+        schema=UNIFIED_SCHEMA,
+    )
+
+
+def write_parquet(parquet_file, fragments_dir):
+    """Concatenate the Parquet fragments in the canonical order.
+
+    Every row group holds the rows of a single source, so readers filtering on
+    `dataset` can skip the row groups of the other sources.
+    """
+    with pq.ParquetWriter(parquet_file, UNIFIED_SCHEMA) as writer:
+        for source in SOURCES:
+            fragment = pq.ParquetFile(
+                os.path.join(fragments_dir, f"{source['name']}.parquet")
             )
-        file_handle.write(f"    </{row_name}>\n")
+            for i in range(fragment.num_row_groups):
+                writer.write_table(fragment.read_row_group(i))
+
+
+def file_fingerprint(path, previous=None):
+    """Return the size, mtime and SHA-256 of a file.
+
+    The hash of the `previous` fingerprint is reused when the size and mtime
+    did not change, so that unchanged inputs are not read again.
+    """
+    stat = os.stat(path)
+    fingerprint = {"size": stat.st_size, "mtime": stat.st_mtime_ns}
+    if previous and all(previous.get(key) == fingerprint[key] for key in fingerprint):
+        fingerprint["sha256"] = previous["sha256"]
+        return fingerprint
+
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    fingerprint["sha256"] = digest.hexdigest()
+    return fingerprint
+
+
+def config_hash(source):
+    """Hash of the reading/cleaning/renaming configuration of a source."""
+    config = json.dumps(
+        [FRAGMENTS_VERSION, PARSER_VERSION, CLEANING_HASH, source], sort_keys=True
+    )
+    return hashlib.sha256(config.encode("utf-8")).hexdigest()
+
+
+def load_manifest(cache_dir):
+    try:
+        with open(os.path.join(cache_dir, "manifest.json"), "r") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def save_manifest(cache_dir, manifest):
+    # Replace the manifest atomically so that an interrupted run cannot corrupt it
+    manifest_path = os.path.join(cache_dir, "manifest.json")
+    with open(f"{manifest_path}.tmp", "w") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(f"{manifest_path}.tmp", manifest_path)
+
+
+def is_fresh(entry, fingerprint, source, cache_dir, formats):
+    """Check whether the cached fragments of a source are still valid.
+
+    The fragments of every format in `formats` must have been written from
+    the current input: a fragment left by an older run is not enough.
+    """
+    if not entry:
+        return False
+    if entry["input"]["sha256"] != fingerprint["sha256"]:
+        return False
+    if entry["config"] != config_hash(source):
+        return False
+    if not set(formats) <= set(entry.get("formats", [])):
+        return False
+    return all(
+        os.path.exists(os.path.join(cache_dir, f"{source['name']}.{extension}"))
+        for extension in formats
+    )
+
+
+def main(
+    root_dir=None,
+    output_file=None,
+    workers=None,
+    parquet_file=None,
+    cache_dir=None,
+    rebuild=False,
+    search_index=None,
+    profile=False,
+):
+    if not root_dir:
+        root_dir = DATASETS_DIR
+        print(f"Root directory not provided. Using default: {root_dir}")
+    if not output_file:
+        output_file = os.path.join(DATASETS_DIR, "merged_datasets.xml")
+    if not cache_dir:
+        cache_dir = os.path.join(
+            os.path.dirname(os.path.abspath(output_file)), ".unify_cache"
+        )
+    if parquet_file and pq is None:
+        raise ImportError("pyarrow is required to write the Parquet output")
+    os.makedirs(cache_dir, exist_ok=True)
+    formats = ["xml"]
+    if parquet_file:
+        formats.append("parquet")
+    if search_index:
+        formats.append("sqlite")
+
+    with RunReport("unify_datasets", output_file, profile) as report:
+        # Step 1: Fingerprint the inputs and find the sources whose cached
+        # fragments are missing or out of date
+        with report.phase("fingerprint") as phase:
+            manifest = {} if rebuild else load_manifest(cache_dir)
+            fingerprints = {}
+            stale = []
+            for source in SOURCES:
+                entry = manifest.get(source["name"])
+                fingerprints[source["name"]] = file_fingerprint(
+                    os.path.join(root_dir, source["csv"]), entry and entry["input"]
+                )
+                if is_fresh(
+                    entry, fingerprints[source["name"]], source, cache_dir, formats
+                ):
+                    print(
+                        f"{source['name']} is unchanged, reusing its cached fragments."
+                    )
+                    # Record the new mtime so that a touched file is hashed only once
+                    entry["input"] = fingerprints[source["name"]]
+                else:
+                    stale.append(source)
+                    # Forget the entry until the new fragments are complete
+                    manifest.pop(source["name"], None)
+            save_manifest(cache_dir, manifest)
+            phase.records = len(SOURCES)
+
+        # Step 2: Read, clean, rename and serialize every stale source in its own
+        # process. The largest sources are submitted first so that they start right away.
+        with report.phase("convert", hot=True) as phase:
+            if stale:
+                print(
+                    f"Converting {len(stale)} dataset(s) to XML fragments in parallel..."
+                )
+                by_size = sorted(
+                    stale,
+                    key=lambda source: fingerprints[source["name"]]["size"],
+                    reverse=True,
+                )
+                with executor(
+                    ProcessPoolExecutor, profile, max_workers=workers
+                ) as pool:
+                    futures = {
+                        pool.submit(
+                            process_source,
+                            source,
+                            root_dir,
+                            cache_dir,
+                            formats,
+                        ): source
+                        for source in by_size
+                    }
+                    with tqdm(
+                        total=len(futures), desc="Converting DataFrames to XML"
+                    ) as pbar:
+                        for future in as_completed(futures):
+                            rows = future.result()
+                            source = futures[future]
+                            manifest[source["name"]] = {
+                                "input": fingerprints[source["name"]],
+                                "config": config_hash(source),
+                                "formats": formats,
+                                "rows": rows,
+                            }
+                            save_manifest(cache_dir, manifest)
+                            pbar.update(1)
+                            phase.records += rows
+                            phase.read(os.path.join(root_dir, source["csv"]))
+                            phase.wrote(
+                                *(
+                                    os.path.join(
+                                        cache_dir, f"{source['name']}.{extension}"
+                                    )
+                                    for extension in formats
+                                )
+                            )
+
+        # Rows of every source, cached or converted
+        rows = sum(manifest[source["name"]].get("rows", 0) for source in SOURCES)
+
+        # Step 3: Concatenate the fragments in the canonical order
+        print("Concatenating the XML fragments...")
+        with report.phase("concatenate") as phase:
+            with open(output_file, "w", encoding="utf-8") as f:
+                f.write("<Datasets>\n")
+                for source in SOURCES:
+                    fragment_path = os.path.join(cache_dir, f"{source['name']}.xml")
+                    with open(fragment_path, "r", encoding="utf-8") as fragment:
+                        shutil.copyfileobj(fragment, f, 1024 * 1024)
+                    phase.read(fragment_path)
+                f.write("</Datasets>\n")
+            phase.records = rows
+            phase.wrote(output_file)
+
+        if parquet_file:
+            print("Writing the columnar output...")
+            with report.phase("parquet") as phase:
+                write_parquet(parquet_file, cache_dir)
+                phase.records = rows
+                phase.wrote(parquet_file)
+            print(f"Parquet file saved as '{parquet_file}'.")
+
+        if search_index:
+            print("Building the full-text search index...")
+            with report.phase("search_index") as phase:
+                build_index(
+                    search_index,
+                    [
+                        os.path.join(cache_dir, f"{source['name']}.sqlite")
+                        for source in SOURCES
+                    ],
+                )
+                phase.records = rows
+                phase.wrote(search_index)
+            print(f"Search index saved as '{search_index}'.")
+
+        print(f"Merged XML saved as '{output_file}'.")
+
+
+def write_dataframe_to_xml(file_handle, df, root_name, row_name, chunk_rows=10000):
+    """Write a DataFrame cleaned by `clean_dataframe` to an XML file incrementally.
+
+    Rows are rendered in chunks: the values of a chunk are converted with
+    `str` as `DataFrame.iterrows` would return them, escaped in one pass and
+    substituted into a template holding the precomputed field tags.
+    Returns the number of rows written.
+    """
+    start = time.perf_counter()
+    file_handle.write(f"  <{root_name}>\n")
+
+    def literal(text):
+        # Protect the tags from %-formatting
+        return text.replace("%", "%%")
+
+    # Template of a single row, with one %s placeholder per field
+    row_template = (
+        literal(f"    <{row_name}>\n")
+        + "".join(
+            literal(f"      <{field}>") + "%s" + literal(f"</{field}>\n")
+            for field in df.columns
+        )
+        + literal(f"    </{row_name}>\n")
+    )
+
+    for chunk_start in range(0, len(df), chunk_rows):
+        # `.values` upcasts the columns to a common type exactly like `iterrows`
+        values = df.iloc[chunk_start : chunk_start + chunk_rows].values
+        file_handle.write(
+            (row_template * len(values)) % tuple(escape_values(values.ravel()))
+        )
+
     file_handle.write(f"  </{root_name}>\n")
 
+    elapsed = time.perf_counter() - start
+    tqdm.write(
+        f"Wrote {len(df)} rows of {root_name} in {elapsed:.1f}s "
+        f"({len(df) / elapsed if elapsed else 0:.0f} rows/s)"
+    )
+    return len(df)
+
+
+def escape_values(values):
+    """Convert values to strings and escape them for XML in a single pass."""
+    strings = list(map(str, values))
+    joined = "\0".join(strings)
+    if joined.count("\0") != max(len(strings) - 1, 0):
+        # A value contains the separator itself: escape the values one by one
+        return [escape(string) for string in strings]
+    return escape(joined).split("\0") if strings else []
+
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(
+        description="Merge the metadata of all datasets into a single XML file."
+    )
+    parser.add_argument(
+        "--root_dir",
+        type=str,
+        default=None,
+        help="Directory containing the dataset folders (defaults to Datasets).",
+    )
+    parser.add_argument(
+        "--output_file",
+        type=str,
+        default=None,
+        help="Path of the merged XML file (defaults to Datasets/merged_datasets.xml).",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=None,
+        help="Number of worker processes (defaults to the number of CPUs).",
+    )
+    parser.add_argument(
+        "--parquet_file",
+        type=str,
+        default=None,
+        help="Also write the unified dataset to this Parquet file.",
+    )
+    parser.add_argument(
+        "--cache_dir",
+        type=str,
+        default=None,
+        help="Directory of the per-dataset fragments and their fingerprints "
+        "(defaults to .unify_cache next to the output file).",
+    )
+    parser.add_argument(
+        "--rebuild",
+        action="store_true",
+        help="Ignore the cached fragments and reprocess every dataset.",
+    )
+    parser.add_argument(
+        "--search_index",
+        type=str,
+        default=None,
+        help="Also build a full-text search index (SQLite FTS5) at this path.",
+    )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="Profile the conversion, in a single process, to "
+        "Datasets/reports (convert.prof).",
+    )
+
+    args = parser.parse_args()
+    main(
+        args.root_dir,
+        args.output_file,
+        args.workers,
+        args.parquet_file,
+        args.cache_dir,
+        args.rebuild,
+        args.search_index,
+        args.profile,
+    )